@@ -0,0 +1,68 @@
+# backend/bench_serialization.py
+# python -m backend.bench_serialization [--copies 20] [--rounds 200]
+#
+# Compares the per-request response_model path (validate + serialize + json
+# encode on every call) with the pre-encoded bytes served by content_cache.
+
+import argparse
+import copy
+import timeit
+from typing import List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from backend import models, serialization
+from backend.seed_data_exams import dummy_exams
+from backend.seed_data_tests import dummy_tests
+
+
+def build_docs(seed_docs: list, copies: int) -> list:
+    docs = []
+    for _ in range(copies):
+        for doc in seed_docs:
+            doc = copy.deepcopy(doc)
+            doc["_id"] = str(ObjectId())
+            docs.append(doc)
+    return docs
+
+
+def bench(label: str, model, docs: list, rounds: int):
+    adapter = TypeAdapter(List[model])
+
+    def response_model_path():
+        # What FastAPI does for `response_model=List[model]` on every request
+        validated = adapter.validate_python(docs)
+        return JSONResponse(adapter.dump_python(validated, mode="json", by_alias=True)).body
+
+    def encode_once():
+        return serialization.join_array(serialization.encode(model, doc) for doc in docs)
+
+    body = encode_once()
+
+    def cached_path():
+        return serialization.RawJSONResponse(body).body
+
+    assert len(response_model_path()) > 0 and cached_path() == body
+
+    print(f"{label}: {len(docs)} documents, {len(body) / 1024:.1f} KiB per listing")
+    baseline = None
+    for name, fn in (("response_model", response_model_path), ("encode once (cold load)", encode_once), ("cached bytes", cached_path)):
+        seconds = min(timeit.repeat(fn, number=rounds, repeat=3)) / rounds
+        baseline = baseline or seconds
+        print(f"  {name:<24} {seconds * 1e6:>10.1f} us/request  {baseline / seconds:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog serialization benchmark")
+    parser.add_argument("--copies", type=int, default=20, help="copies of the seed catalog to serialize")
+    parser.add_argument("--rounds", type=int, default=200, help="requests per timing run")
+    args = parser.parse_args()
+
+    bench("exams", models.ExamModel, build_docs(dummy_exams, args.copies), args.rounds)
+    bench("tests", models.TestModel, build_docs(dummy_tests, args.copies), args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# backend/case_stats.py
+# Per-question test-case statistics for all-or-nothing grading. Every graded
+# coding answer adds its per-case outcomes to a `case_stats` document, and
+# the fail-fast policy runs the cases most likely to fail first, in waves of
+# 1, 2, 4, ... cases, stopping at the first wave with a failure. A wrong
+# answer is then usually rejected after one or two executions, while a
+# correct one still runs every case in log2(n) rounds.
+import hashlib
+import os
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from pymongo.errors import PyMongoError
+from backend import database, metrics
+from backend.cache import TTLCache
+
+EXAM_GRADING_POLICY = os.getenv("EXAM_GRADING_POLICY", "all")  # "all" or "fail_fast"
+CASE_STATS_TTL_SECONDS = float(os.getenv("CASE_STATS_TTL_SECONDS", "300"))
+
+# Outcomes that say something about the answer; internal errors (13) and
+# unreported harness/sandbox failures (14) don't
+IGNORED_STATUS_IDS = {13, 14}
+
+case_stats_collection = database.db["case_stats"]
+
+CaseRunner = Callable[[List[dict]], Awaitable[List[dict]]]
+
+
+def case_key(case: dict) -> str:
+    """Identifies a case by content, so reordering or inserting cases keeps its history."""
+    payload = f"{case.get('input', '')}\0{case.get('output', '')}".encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+
+def _accepted(result: dict) -> bool:
+    return result["status"]["description"] == "Accepted"
+
+
+class CaseStats:
+    def __init__(self, ttl_seconds: float):
+        self.cache = TTLCache(max_size=5000, ttl_seconds=ttl_seconds)
+        self.executed = 0
+        self.skipped = 0  # cases fail-fast never had to run
+
+    async def _load(self, content_id: str, question_id: str) -> Dict[str, dict]:
+        doc_id = f"{content_id}:{question_id}"
+        stats = self.cache.get(doc_id)
+        if stats is None:
+            try:
+                doc = await case_stats_collection.find_one({"_id": doc_id})
+            except PyMongoError:
+                doc = None
+            stats = (doc or {}).get("cases", {})
+            self.cache.set(doc_id, stats)
+        return stats
+
+    async def order(self, content_id: str, question_id: str, cases: List[dict]) -> List[dict]:
+        """Cases by smoothed historical failure rate, highest first; ties keep the authored order."""
+        stats = await self._load(content_id, question_id)
+
+        def failure_rate(case: dict) -> float:
+            entry = stats.get(case_key(case), {})
+            return (entry.get("failures", 0) + 1) / (entry.get("runs", 0) + 2)
+
+        return sorted(cases, key=failure_rate, reverse=True)  # sorted() is stable
+
+    async def record(self, content_id: str, question_id: str, outcomes: List[Tuple[dict, dict]]):
+        """Adds (case, result) outcomes to the question's statistics."""
+        increments = {}
+        for case, result in outcomes:
+            if result["status"].get("id") in IGNORED_STATUS_IDS:
+                continue
+            key = case_key(case)
+            increments[f"cases.{key}.runs"] = increments.get(f"cases.{key}.runs", 0) + 1
+            if not _accepted(result):
+                increments[f"cases.{key}.failures"] = increments.get(f"cases.{key}.failures", 0) + 1
+        if not increments:
+            return
+        doc_id = f"{content_id}:{question_id}"
+        try:
+            await case_stats_collection.update_one(
+                {"_id": doc_id},
+                {"$inc": increments, "$set": {"content_id": content_id, "question_id": question_id}},
+                upsert=True,
+            )
+        except PyMongoError:
+            return  # statistics only affect ordering; grading goes on without them
+        self.cache.invalidate(doc_id)
+
+    async def run_fail_fast(self, cases: List[dict], run: CaseRunner) -> Tuple[List[Tuple[dict, dict]], bool]:
+        """Runs ordered cases in doubling waves until one fails; returns the outcomes and whether it stopped early."""
+        outcomes: List[Tuple[dict, dict]] = []
+        wave = 1
+        while len(outcomes) < len(cases):
+            batch = cases[len(outcomes):len(outcomes) + wave]
+            results = await run(batch)
+            outcomes.extend(zip(batch, results))
+            if not all(_accepted(result) for result in results):
+                break
+            wave *= 2
+        self.executed += len(outcomes)
+        self.skipped += len(cases) - len(outcomes)
+        return outcomes, len(outcomes) < len(cases)
+
+    def stats(self) -> dict:
+        return {
+            "policy": EXAM_GRADING_POLICY,
+            "executed_cases": self.executed,
+            "skipped_cases": self.skipped,
+            "cache": self.cache.stats(),
+        }
+
+
+case_stats = CaseStats(CASE_STATS_TTL_SECONDS)
+metrics.register("case_stats", case_stats.stats)
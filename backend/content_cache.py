@@ -0,0 +1,226 @@
+# backend/content_cache.py
+# python -m backend.content_cache [exams|tests|practice|interviews ...]
+#
+# Read-through cache for the content catalogs (exams, tests, practice,
+# interviews). Each catalog is loaded once, versioned, and reloaded when it
+# changes or after the TTL. Content is written outside the API (the seed
+# scripts, the re-grade job, hand edits), so writers bump a per-catalog
+# counter in `content_versions` with changed(), and every process probes that
+# counter at most every CONTENT_CACHE_CHECK_SECONDS. Run this module after
+# editing content by hand to do the same. A load that an invalidation
+# overtakes is thrown away rather than installed.
+# Endpoints only ever see the precomputed client view, which has answers and
+# hidden test cases stripped; graders use document() for the full record.
+# Client views are validated and encoded once per load, and the bytes are
+# sent as-is (see backend/serialization.py).
+import argparse
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fastapi import Request, Response
+from pymongo.errors import PyMongoError
+from backend import database, metrics, models, serialization
+
+CONTENT_CACHE_TTL_SECONDS = float(os.getenv("CONTENT_CACHE_TTL_SECONDS", "300"))
+# How stale a catalog can be after another process changes it
+CONTENT_CACHE_CHECK_SECONDS = float(os.getenv("CONTENT_CACHE_CHECK_SECONDS", "2"))
+
+versions_collection = database.db["content_versions"]
+
+
+class CachedContent(NamedTuple):
+    etag: str
+    data: object
+    body: bytes
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _cached(data, body: bytes) -> CachedContent:
+    return CachedContent(compute_etag(body), data, body)
+
+
+class ContentCache:
+    """Versioned in-memory copy of one content collection."""
+
+    def __init__(self, name: str, collection_name: str, model, prepare: Callable[[dict], dict], ttl_seconds: float):
+        self.name = name
+        self.collection_name = collection_name
+        self.model = model
+        self.prepare = prepare
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.discarded_loads = 0
+        self._listing: Optional[CachedContent] = None
+        self._items: Dict[str, CachedContent] = {}
+        self._documents: Dict[str, dict] = {}
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._stamp = None  # the content_versions counter the loaded data matches
+        self._generation = 0  # bumped by invalidate(), so a load it overtakes is discarded
+        self._lock = asyncio.Lock()
+        self._listeners: List[Callable[[str], None]] = []
+
+    def _fresh(self) -> bool:
+        return self._listing is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    async def _shared_version(self) -> int:
+        doc = await versions_collection.find_one({"_id": self.name})
+        return doc.get("version", 0) if doc else 0
+
+    async def _changed_elsewhere(self) -> bool:
+        if time.monotonic() - self._checked_at < CONTENT_CACHE_CHECK_SECONDS:
+            return False
+        self._checked_at = time.monotonic()  # concurrent requests don't probe again meanwhile
+        try:
+            return await self._shared_version() != self._stamp
+        except PyMongoError:
+            return False  # keep serving what we have; the TTL still bounds it
+
+    async def _ensure_loaded(self):
+        if self._fresh():
+            if not await self._changed_elsewhere():
+                self.hits += 1
+                return
+            self.invalidate()
+        async with self._lock:
+            if self._fresh():  # another request loaded it while we waited
+                self.hits += 1
+                return
+            self.misses += 1
+            while True:
+                generation = self._generation
+                # Read before the documents: a change landing during the load makes the next probe reload
+                stamp = await self._shared_version()
+                collection = getattr(database, self.collection_name)
+                docs = [self.prepare(doc) for doc in await collection.find().to_list(length=None)]
+                if generation != self._generation:
+                    self.discarded_loads += 1  # invalidated mid-load: these documents may predate the change
+                    continue
+                break
+            views = [client_view(doc) for doc in docs]
+            bodies = [serialization.encode(self.model, view) for view in views]
+            self._documents = {doc["_id"]: doc for doc in docs}
+            self._items = {view["_id"]: _cached(view, body) for view, body in zip(views, bodies)}
+            self._listing = _cached(views, serialization.join_array(bodies))
+            self._loaded_at = self._checked_at = time.monotonic()
+            self._stamp = stamp
+            self.loads += 1
+            self.version += 1
+
+    async def listing(self) -> CachedContent:
+        """Client views of all documents. Callers must treat the data as read-only."""
+        await self._ensure_loaded()
+        return self._listing
+
+    async def item(self, content_id: str) -> Optional[CachedContent]:
+        await self._ensure_loaded()
+        return self._items.get(content_id)
+
+    async def document(self, content_id: str) -> Optional[dict]:
+        """Full document including answers, for server-side use only."""
+        await self._ensure_loaded()
+        return self._documents.get(content_id)
+
+    def subscribe(self, listener: Callable[[str], None]):
+        """Registers a callback run with the cache name on every invalidation."""
+        self._listeners.append(listener)
+
+    def invalidate(self):
+        """Drops this process's copy; see changed() to reach every process."""
+        self._listing = None
+        self._items = {}
+        self._documents = {}
+        self._generation += 1
+        self.version += 1
+        for listener in self._listeners:
+            listener(self.name)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "documents": len(self._items),
+            "hits": self.hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "discarded_loads": self.discarded_loads,
+            "shared_version": self._stamp,
+        }
+
+
+def _client_question(question: dict) -> dict:
+    view = {k: v for k, v in question.items() if k not in ("correct_answer", "expected_answer")}
+    if view.get("test_cases"):
+        # Keep hidden cases as placeholders so clients can still show how many there are
+        view["test_cases"] = [
+            {"input": "", "output": "", "hidden": True} if tc.get("hidden") else tc
+            for tc in view["test_cases"]
+        ]
+    return view
+
+
+def client_view(doc: dict) -> dict:
+    return {**doc, "questions": [_client_question(q) for q in doc.get("questions", [])]}
+
+
+def _with_str_id(doc: dict) -> dict:
+    doc["_id"] = str(doc["_id"])
+    return doc
+
+
+def _prepare_test(doc: dict) -> dict:
+    doc = _with_str_id(doc)
+    doc.setdefault("pass_criteria", 80)
+    return doc
+
+
+exams = ContentCache("exams", "exams_collection", models.ExamModel, _with_str_id, CONTENT_CACHE_TTL_SECONDS)
+tests = ContentCache("tests", "tests_collection", models.TestModel, _prepare_test, CONTENT_CACHE_TTL_SECONDS)
+practice = ContentCache("practice", "practice_collection", models.PracticeModel, _with_str_id, CONTENT_CACHE_TTL_SECONDS)
+interviews = ContentCache("interviews", "interviews_collection", dict, _with_str_id, CONTENT_CACHE_TTL_SECONDS)
+
+caches = {cache.name: cache for cache in (exams, tests, practice, interviews)}
+
+
+async def changed(*names: str):
+    """Call after writing to content collections: every process reloads those catalogs."""
+    for name in names:
+        await versions_collection.update_one(
+            {"_id": name}, {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}}, upsert=True,
+        )
+        caches[name].invalidate()
+
+
+def respond(request: Request, cached: CachedContent) -> Response:
+    """Returns the pre-encoded body, or a bare 304 if the client already has this version."""
+    headers = {"ETag": cached.etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or cached.etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return serialization.RawJSONResponse(cached.body, headers=headers)
+
+
+metrics.register("content_cache", lambda: {name: cache.stats() for name, cache in caches.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Make every API process reload content catalogs after a hand edit.")
+    parser.add_argument("names", nargs="*", metavar="catalog", help=f"one of {', '.join(caches)} (default: all)")
+    args = parser.parse_args()
+    unknown = sorted(set(args.names) - set(caches))
+    if unknown:
+        parser.error(f"unknown catalog: {', '.join(unknown)}")
+    asyncio.run(changed(*(args.names or caches)))
+
+
+if __name__ == "__main__":
+    main()
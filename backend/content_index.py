@@ -0,0 +1,100 @@
+# backend/content_index.py
+# Grading-oriented compilation of the content cache. Each exam, test and
+# interview is turned into compact records once per content version, with
+# questions addressable by id, MCQ answer keys extracted and test cases
+# already split into visible and hidden sets. Records are dropped whenever
+# the cache reloads, which includes a content_cache.changed() bump from any
+# process, so grading picks up an edited answer key within
+# CONTENT_CACHE_CHECK_SECONDS.
+import hashlib
+import json
+from typing import Dict, Optional, Tuple
+
+from backend import content_cache, metrics
+
+
+class QuestionRecord:
+    __slots__ = (
+        "id", "question_type", "text", "options", "correct_answer", "expected_answer",
+        "all_cases", "visible_cases", "hidden_cases", "cases_fingerprint",
+    )
+
+    def __init__(self, question: dict):
+        self.id = question["id"]
+        self.question_type = question.get("question_type", "")
+        self.text = question.get("text", "")
+        self.options: Tuple[str, ...] = tuple(question.get("options") or ())
+        self.correct_answer = question.get("correct_answer")
+        self.expected_answer = question.get("expected_answer", "")
+        cases = tuple(question.get("test_cases") or ())
+        self.all_cases = cases
+        self.visible_cases = tuple(tc for tc in cases if not tc.get("hidden"))
+        self.hidden_cases = tuple(tc for tc in cases if tc.get("hidden"))
+        # Stored with graded coding answers so a re-grade can tell whether the cases changed since
+        self.cases_fingerprint = hashlib.sha1(
+            json.dumps(cases, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:16] if cases else None
+
+
+class ContentRecord:
+    __slots__ = ("id", "title", "tags", "pass_criteria", "questions", "by_id", "answer_key")
+
+    def __init__(self, doc: dict):
+        self.id = str(doc["_id"])
+        self.title = doc.get("title", "")
+        self.tags: Tuple[str, ...] = tuple(doc.get("tags") or ())
+        self.pass_criteria = doc.get("pass_criteria", 80)
+        self.questions: Tuple[QuestionRecord, ...] = tuple(QuestionRecord(q) for q in doc.get("questions", []))
+        self.by_id: Dict[str, QuestionRecord] = {q.id: q for q in self.questions}
+        self.answer_key: Dict[str, Optional[str]] = {
+            q.id: q.correct_answer for q in self.questions if q.question_type == "mcq"
+        }
+
+    @property
+    def question_count(self) -> int:
+        return len(self.questions)
+
+    @property
+    def key_version(self) -> str:
+        """Changes whenever a question, answer key or test case does."""
+        parts = [(q.id, q.question_type, q.correct_answer, q.cases_fingerprint) for q in self.questions]
+        return hashlib.sha1(json.dumps(parts, default=str).encode("utf-8")).hexdigest()[:12]
+
+    def question(self, question_id: str) -> Optional[QuestionRecord]:
+        return self.by_id.get(question_id)
+
+
+class ContentIndex:
+    """Compiled records for one content cache, rebuilt whenever its version changes."""
+
+    def __init__(self, cache: content_cache.ContentCache):
+        self.cache = cache
+        self.compiles = 0
+        self._records: Dict[str, ContentRecord] = {}
+        self._version = None
+        cache.subscribe(lambda name: self._records.clear())
+
+    async def get(self, content_id: str) -> Optional[ContentRecord]:
+        doc = await self.cache.document(content_id)  # reloads the cache if stale
+        if self._version != self.cache.version:
+            self._records = {}
+            self._version = self.cache.version
+        if doc is None:
+            return None
+        record = self._records.get(content_id)
+        if record is None:
+            record = self._records[content_id] = ContentRecord(doc)
+            self.compiles += 1
+        return record
+
+    def stats(self) -> dict:
+        return {"version": self._version, "records": len(self._records), "compiles": self.compiles}
+
+
+exams = ContentIndex(content_cache.exams)
+tests = ContentIndex(content_cache.tests)
+interviews = ContentIndex(content_cache.interviews)
+
+metrics.register("content_index", lambda: {
+    "exams": exams.stats(), "tests": tests.stats(), "interviews": interviews.stats(),
+})
@@ -29,6 +29,7 @@ results_collection = db["results"]
 interview_sessions_collection = db["interview_sessions"]
 interview_results_collection = db["interview_results"]
 interviews_collection = db["interviews"]
+execution_results_collection = db["execution_results"]
 
 async def get_db():
     return db
\ No newline at end of file
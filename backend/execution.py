@@ -0,0 +1,113 @@
+# backend/execution.py
+# Code execution backends behind run_code and the test grader. A backend is
+# any coroutine taking (client, submissions) and returning one Judge0-shaped
+# result per submission, in order. EXECUTION_BACKEND=local sends Python
+# batches to the in-process sandbox pool (backend/sandbox.py); everything
+# else, and every other language, goes to the Judge0 service the caller names.
+# With EXECUTION_BATCHING on (the default), Judge0 runs from all requests are
+# pooled into shared batches by backend/execution_scheduler.py. Remote calls
+# go through the upstream's bulkhead and circuit breaker (backend/resilience.py).
+# With EXECUTION_HARNESS on, run_cases sends a multi-case Python question to
+# Judge0 as a single harness submission (backend/harness.py).
+import base64
+import os
+from typing import Awaitable, Callable, Dict, List
+
+from backend import harness, judge0, resilience, sandbox
+from backend.execution_cache import execution_cache
+from backend.execution_scheduler import EXECUTION_BATCHING, scheduler
+from backend.http_client import OutboundClient
+
+EXECUTION_BACKEND = os.getenv("EXECUTION_BACKEND", "judge0")  # "judge0" or "local"
+
+# Judge0 language ids the local sandbox can run
+LOCAL_LANGUAGE_IDS = {71}  # Python 3
+
+Backend = Callable[[OutboundClient, List[dict]], Awaitable[List[dict]]]
+
+BACKENDS: Dict[str, Backend] = {
+    "rapidapi": judge0.run_batch,
+    "judge0": judge0.run_self_hosted,
+    "local": lambda client, submissions: sandbox.local_backend.run(submissions),
+}
+
+# Batch-endpoint runners for the upstreams the scheduler can pool
+BATCH_BACKENDS: Dict[str, Backend] = {
+    "rapidapi": judge0.run_batch,
+    "judge0": lambda client, submissions, **options: judge0.run_batch(client, submissions, upstream="judge0", **options),
+}
+
+
+def _guarded(name: str, backend: Backend) -> Backend:
+    upstream_guard = resilience.guard(name)
+
+    async def run(client: OutboundClient, submissions: List[dict], **options) -> List[dict]:
+        return await upstream_guard.call(lambda: backend(client, submissions, **options))
+    return run
+
+
+def local_enabled() -> bool:
+    return EXECUTION_BACKEND == "local"
+
+
+def select_backend(upstream: str, submissions: List[dict]) -> str:
+    if local_enabled() and all(sub["language_id"] in LOCAL_LANGUAGE_IDS for sub in submissions):
+        return "local"
+    return upstream
+
+
+async def execute(upstream: str, submissions: List[dict], client: OutboundClient) -> List[dict]:
+    """Runs submissions on the selected backend through the execution cache."""
+    name = select_backend(upstream, submissions)
+    if name == "local":
+        backend = BACKENDS[name]
+    else:
+        judge0.check_configured(name)  # a setup error is reported as such, before the breaker sees it
+        resilience.guard(name).breaker.check()  # don't queue work for an upstream that is failing
+        if EXECUTION_BATCHING and name in BATCH_BACKENDS:
+            backend = scheduler.batcher(name, _guarded(name, BATCH_BACKENDS[name])).submit
+        else:
+            backend = _guarded(name, BACKENDS[name])
+    return await execution_cache.run(name, submissions, lambda pending: backend(client, pending))
+
+
+def _b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("utf-8")
+
+
+async def run_cases(
+    upstream: str,
+    source_code: str,
+    language_id: int,
+    test_cases: List[dict],
+    client: OutboundClient,
+    compare_output: bool = True
+) -> List[dict]:
+    """One result per test case, in order. source_code is base64 encoded.
+
+    With compare_output the expected outputs are checked (Accepted/Wrong
+    Answer); without it a case is Accepted when it runs cleanly.
+    """
+    remote = select_backend(upstream, [{"language_id": language_id}]) != "local"
+    if remote and harness.supports(language_id, test_cases):
+        submission, key = harness.build_submission(source_code, language_id, test_cases)
+        [result] = await execute(upstream, [submission], client)
+        return harness.split_result(result, key, test_cases, compare_output)
+
+    submissions = []
+    for tc in test_cases:
+        submission = {"source_code": source_code, "language_id": language_id, "stdin": _b64(tc.get("input", ""))}
+        if compare_output:
+            submission["expected_output"] = _b64(tc.get("output", ""))
+        submissions.append(submission)
+    return await execute(upstream, submissions, client)
+
+
+async def start():
+    if local_enabled():
+        await sandbox.local_backend.start()
+
+
+async def close():
+    if local_enabled():
+        await sandbox.local_backend.close()
@@ -0,0 +1,151 @@
+# backend/execution_cache.py
+# Content-addressed cache in front of code execution. Every submission (one
+# source/stdin/expected-output/limits combination) is keyed by a hash of its
+# payload, so re-running unchanged code, or re-grading it on submit, reuses
+# the earlier verdict instead of paying for another Judge0 submission.
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+from backend import database, metrics
+from backend.cache import TTLCache
+
+EXECUTION_CACHE_SIZE = int(os.getenv("EXECUTION_CACHE_SIZE", "20000"))
+EXECUTION_CACHE_TTL_SECONDS = float(os.getenv("EXECUTION_CACHE_TTL_SECONDS", "3600"))
+# Persisted entries expire via the created_at TTL index in backend/indexes.py
+EXECUTION_CACHE_PERSISTENT = os.getenv("EXECUTION_CACHE_PERSISTENT", "false").lower() == "true"
+
+# Verdicts that depend only on the program and its input. Time limits (5) and
+# internal/sandbox errors (13, 14) can be caused by load, so they're re-run.
+CACHEABLE_STATUS_IDS = {3, 4, 6, 7, 8, 9, 10, 11, 12}
+
+Executor = Callable[[List[dict]], Awaitable[List[dict]]]
+
+
+def submission_key(upstream: str, submission: dict) -> str:
+    payload = {k: v for k, v in submission.items() if k != "callback_url"}
+    encoded = json.dumps([upstream, payload], sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _cacheable(result: dict) -> bool:
+    return (result.get("status") or {}).get("id") in CACHEABLE_STATUS_IDS
+
+
+class ExecutionCache:
+    """Memory tier, optional Mongo tier, and single-flight sharing of in-progress runs."""
+
+    def __init__(self, memory: TTLCache, persistent: bool):
+        self.memory = memory
+        self.persistent = persistent
+        self.persistent_hits = 0
+        self.joined = 0  # submissions that waited on an identical in-flight run
+        self.executed = 0
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def _load_persistent(self, keys: List[str]) -> Dict[str, dict]:
+        if not self.persistent or not keys:
+            return {}
+        try:
+            docs = await database.execution_results_collection.find({"_id": {"$in": keys}}).to_list(length=len(keys))
+        except PyMongoError:
+            return {}
+        self.persistent_hits += len(docs)
+        return {doc["_id"]: doc["result"] for doc in docs}
+
+    async def _store_persistent(self, entries: Dict[str, dict]):
+        if not self.persistent or not entries:
+            return
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne({"_id": key}, {"$set": {"result": result, "created_at": now}}, upsert=True)
+            for key, result in entries.items()
+        ]
+        try:
+            await database.execution_results_collection.bulk_write(operations, ordered=False)
+        except PyMongoError:
+            pass  # the memory tier still has them
+
+    async def run(self, upstream: str, submissions: List[dict], execute: Executor) -> List[dict]:
+        """Returns results for submissions in order, executing only the ones nobody has a result for."""
+        keys = [submission_key(upstream, sub) for sub in submissions]
+        found: Dict[str, dict] = {}
+        joined: Dict[str, asyncio.Future] = {}
+        unresolved = []
+        for key in dict.fromkeys(keys):  # de-duplicates within the batch, keeps order
+            cached = self.memory.get(key)
+            if cached is not None:
+                found[key] = cached
+            elif key in self._in_flight:
+                joined[key] = self._in_flight[key]
+            else:
+                unresolved.append(key)
+
+        for key, result in (await self._load_persistent(unresolved)).items():
+            self.memory.set(key, result)
+            found[key] = result
+        # Re-check in-flight: another request may have started the same run during the Mongo lookup
+        to_run = []
+        for key in unresolved:
+            if key in found:
+                continue
+            if key in self._in_flight:
+                joined[key] = self._in_flight[key]
+            else:
+                to_run.append(key)
+
+        if to_run:
+            loop = asyncio.get_running_loop()
+            futures = {key: loop.create_future() for key in to_run}
+            self._in_flight.update(futures)
+            by_key = dict(zip(keys, submissions))
+            try:
+                results = await execute([by_key[key] for key in to_run])
+            except BaseException as e:
+                for future in futures.values():
+                    if isinstance(e, Exception):
+                        future.set_exception(e)
+                        future.exception()  # mark retrieved in case nobody joined
+                    else:
+                        future.cancel()
+                raise
+            finally:
+                for key in to_run:
+                    self._in_flight.pop(key, None)
+            self.executed += len(to_run)
+            to_store = {}
+            for key, result in zip(to_run, results):
+                futures[key].set_result(result)
+                found[key] = result
+                if _cacheable(result):
+                    self.memory.set(key, result)
+                    to_store[key] = result
+            await self._store_persistent(to_store)
+
+        if joined:
+            self.joined += len(joined)
+            for key, future in joined.items():
+                found[key] = await asyncio.shield(future)
+        return [found[key] for key in keys]
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        served = memory["hits"] + self.persistent_hits + self.joined
+        total = served + self.executed
+        return {
+            "memory": memory,
+            "persistent": self.persistent,
+            "persistent_hits": self.persistent_hits,
+            "single_flight_joins": self.joined,
+            "executed": self.executed,
+            "hit_rate": round(served / total, 4) if total else 0.0,
+        }
+
+
+execution_cache = ExecutionCache(TTLCache(EXECUTION_CACHE_SIZE, EXECUTION_CACHE_TTL_SECONDS), EXECUTION_CACHE_PERSISTENT)
+metrics.register("execution_cache", execution_cache.stats)
@@ -0,0 +1,133 @@
+# backend/execution_scheduler.py
+# Cross-request micro-batching for Judge0. Runs queued by any request within
+# EXECUTION_BATCH_WINDOW_MS (or until EXECUTION_BATCH_MAX are waiting) go out
+# as one /submissions/batch call, and each result is routed back to the
+# coroutine that queued it as soon as that submission finishes, so runs from
+# unrelated users never wait on, or fail with, each other's. During an exam
+# rush this turns hundreds of small per-user batches into a few full ones.
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Set
+
+from backend import metrics
+from backend.http_client import OutboundClient
+
+EXECUTION_BATCHING = os.getenv("EXECUTION_BATCHING", "true").lower() == "true"
+EXECUTION_BATCH_WINDOW_MS = float(os.getenv("EXECUTION_BATCH_WINDOW_MS", "5"))
+# Judge0's default MAX_SUBMISSION_BATCH_SIZE is 20
+EXECUTION_BATCH_MAX = int(os.getenv("EXECUTION_BATCH_MAX", "20"))
+
+# (client, submissions, futures=...): resolves each future as its submission finishes, and returns all results
+BatchRunner = Callable[..., Awaitable[List[dict]]]
+
+
+class PendingRun(NamedTuple):
+    submission: dict
+    client: OutboundClient
+    future: asyncio.Future
+    queued_at: float
+
+
+class MicroBatcher:
+    """Collects submissions for one upstream and flushes them as batches."""
+
+    def __init__(self, run_batch: BatchRunner, window_seconds: float, max_batch: int):
+        self.run_batch = run_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.batches = 0
+        self.submissions = 0
+        self.flushes = {"full": 0, "window": 0}
+        self._pending: List[PendingRun] = []
+        self._timer = None
+        self._running: Set[asyncio.Task] = set()
+        self._queue_delay = metrics.OperationTimer()
+        self._batch_timer = metrics.OperationTimer()
+
+    async def submit(self, client: OutboundClient, submissions: List[dict]) -> List[dict]:
+        """Queues submissions and returns their results in order once their batches finish."""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for submission in submissions:
+            future = loop.create_future()
+            self._pending.append(PendingRun(submission, client, future, time.perf_counter()))
+            futures.append(future)
+            if len(self._pending) >= self.max_batch:
+                self._flush("full")
+        if self._pending and self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush, "window")
+        return list(await asyncio.gather(*futures))
+
+    def _flush(self, reason: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        # Runs whose caller has gone away (cancelled) don't need executing
+        batch = [run for run in batch if not run.future.done()]
+        if batch:
+            self.flushes[reason] += 1
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.window_seconds, self._flush, "window")
+
+    async def _run(self, batch: List[PendingRun]):
+        start = time.perf_counter()
+        for run in batch:
+            self._queue_delay.observe(start - run.queued_at)
+        self.batches += 1
+        self.submissions += len(batch)
+        try:
+            # Every request passes the same shared client; the first one is as good as any
+            results = await self.run_batch(
+                batch[0].client, [run.submission for run in batch], futures=[run.future for run in batch],
+            )
+        except Exception as e:
+            self._batch_timer.observe(time.perf_counter() - start, error=True)
+            for run in batch:  # whatever the runner didn't settle itself
+                if not run.future.done():
+                    run.future.set_exception(e)
+                    run.future.exception()  # mark retrieved if its caller already left
+            return
+        self._batch_timer.observe(time.perf_counter() - start)
+        for run, result in zip(batch, results):
+            if not run.future.done():
+                run.future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": self.window_seconds * 1000,
+            "max_batch": self.max_batch,
+            "queued": len(self._pending),
+            "in_flight_batches": len(self._running),
+            "batches": self.batches,
+            "submissions": self.submissions,
+            "mean_batch_fill": round(self.submissions / (self.batches * self.max_batch), 4) if self.batches else 0.0,
+            "flushes": dict(self.flushes),
+            "queue_delay": self._queue_delay.snapshot(),
+            "batch": self._batch_timer.snapshot(),
+        }
+
+
+class ExecutionScheduler:
+    """One micro-batcher per upstream, created on first use."""
+
+    def __init__(self, window_seconds: float, max_batch: int):
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._batchers: Dict[str, MicroBatcher] = {}
+
+    def batcher(self, upstream: str, run_batch: BatchRunner) -> MicroBatcher:
+        if upstream not in self._batchers:
+            self._batchers[upstream] = MicroBatcher(run_batch, self.window_seconds, self.max_batch)
+        return self._batchers[upstream]
+
+    def stats(self) -> dict:
+        return {"enabled": EXECUTION_BATCHING, **{name: b.stats() for name, b in self._batchers.items()}}
+
+
+scheduler = ExecutionScheduler(EXECUTION_BATCH_WINDOW_MS / 1000, EXECUTION_BATCH_MAX)
+metrics.register("execution_scheduler", scheduler.stats)
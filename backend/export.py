@@ -0,0 +1,258 @@
+# backend/export.py
+# python -m backend.export [--kind exam|test|interview] [--content-id ID] [--tag TAG]
+#                          [--since DATE] [--until DATE] [--format ndjson|csv|parquet] [--gzip] [-o FILE]
+#
+# Bulk export of exam results, test attempts and interview results as flat
+# rows. Documents come off a server-side cursor EXPORT_BATCH_SIZE at a time
+# and each batch is encoded into one chunk before the next is fetched, so a
+# consumer that reads slowly (an HTTP client, a pipe) holds the cursor back
+# and memory stays at one batch however many rows there are. Parquet needs
+# the optional pyarrow package and is written one row group per batch.
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from fastapi import HTTPException
+from backend import database
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+COLUMNS = ["id", "type", "user_id", "content_id", "title", "session_id", "score", "score_percent", "submitted_at"]
+
+# kind -> (collection, content id field, title field, score field, factor to a percentage, content collection)
+SOURCES = {
+    "exam": (database.results_collection, "exam_id", "exam_title", "score", 1, database.exams_collection),
+    "test": (database.attempts_collection, "test_id", "test_name", "score", 1, database.tests_collection),
+    "interview": (
+        database.interview_results_collection, "interview_id", "interview_title", "final_score", 20,  # scored 1-5
+        database.interviews_collection,
+    ),
+}
+
+
+def parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
+
+async def _query(kind: str, content_id: Optional[str], tag: Optional[str],
+                 since: Optional[datetime], until: Optional[datetime]) -> Optional[dict]:
+    """Mongo filter for one source, or None when the filter can't match anything in it."""
+    _, content_field, _, _, _, content_collection = SOURCES[kind]
+    query = {}
+    if tag:
+        tagged = await content_collection.distinct("_id", {"tags": tag})
+        ids = [str(_id) for _id in tagged]
+        if content_id:
+            ids = [_id for _id in ids if _id == content_id]
+        if not ids:
+            return None
+        query[content_field] = {"$in": ids}
+    elif content_id:
+        query[content_field] = content_id
+    if since or until:
+        query["submitted_at"] = {}
+        if since:
+            query["submitted_at"]["$gte"] = since
+        if until:
+            query["submitted_at"]["$lt"] = until
+    return query
+
+
+def _row(kind: str, doc: dict) -> dict:
+    _, content_field, title_field, score_field, scale, _ = SOURCES[kind]
+    score = doc.get(score_field)
+    numeric = isinstance(score, (int, float))
+    return {
+        "id": str(doc["_id"]),
+        "type": kind,
+        "user_id": doc.get("user_id"),
+        "content_id": doc.get(content_field),
+        "title": doc.get(title_field),
+        "session_id": doc.get("session_id"),
+        "score": float(score) if numeric else None,
+        "score_percent": round(score * scale, 2) if numeric else None,
+        "submitted_at": doc.get("submitted_at"),
+    }
+
+
+async def row_batches(kinds: List[str], content_id: Optional[str] = None, tag: Optional[str] = None,
+                      since: Optional[datetime] = None, until: Optional[datetime] = None,
+                      batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[List[dict]]:
+    """Rows in batches of at most batch_size, one source after another, each in _id order."""
+    for kind in kinds:
+        collection, content_field, title_field, score_field, _, _ = SOURCES[kind]
+        query = await _query(kind, content_id, tag, since, until)
+        if query is None:
+            continue
+        fields = {"user_id": 1, content_field: 1, title_field: 1, score_field: 1, "session_id": 1, "submitted_at": 1}
+        cursor = collection.find(query, fields).sort("_id", 1).batch_size(batch_size)
+        batch = []
+        async for doc in cursor:
+            batch.append(_row(kind, doc))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+# --- Encoders: each turns row batches into byte chunks ---
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def _ndjson(batches: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    async for batch in batches:
+        yield "".join(json.dumps(row, default=_json_default) + "\n" for row in batch).encode("utf-8")
+
+
+async def _csv(batches: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    async for batch in batches:
+        for row in batch:
+            writer.writerow({**row, "submitted_at": row["submitted_at"].isoformat() if row["submitted_at"] else None})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Drain(io.RawIOBase):
+    """Write-only file that hands over whatever was written since the last take()."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401  (optional dependency: pip install pyarrow)
+        return True
+    except ImportError:
+        return False
+
+
+async def _parquet(batches: AsyncIterator[List[dict]]) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("id", pa.string()), ("type", pa.string()), ("user_id", pa.string()), ("content_id", pa.string()),
+        ("title", pa.string()), ("session_id", pa.string()), ("score", pa.float64()),
+        ("score_percent", pa.float64()), ("submitted_at", pa.timestamp("ms")),
+    ])
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for batch in batches:
+            columns = {name: [row[name] for row in batch] for name in COLUMNS}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))  # one row group per batch
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()  # footer
+
+
+ENCODERS = {"ndjson": _ndjson, "csv": _csv, "parquet": _parquet}
+
+
+async def _gzipped(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    if fmt == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs the pyarrow package.")
+
+
+def stream(fmt: str, batches: AsyncIterator[List[dict]], gzip: bool = False) -> AsyncIterator[bytes]:
+    check_format(fmt)
+    chunks = ENCODERS[fmt](batches)
+    return _gzipped(chunks) if gzip else chunks
+
+
+def filename(fmt: str, kinds: List[str], gzip: bool) -> str:
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    name = f"evalytics-{'-'.join(kinds)}-{stamp}.{FORMATS[fmt][1]}"
+    return name + ".gz" if gzip else name
+
+
+async def run(args):
+    kinds = [args.kind] if args.kind else list(SOURCES)
+    batches = row_batches(kinds, args.content_id, args.tag, parse_date(args.since), parse_date(args.until), args.batch_size)
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        async for chunk in stream(args.format, batches, args.gzip):
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export results, attempts and interview results.")
+    parser.add_argument("--kind", choices=list(SOURCES), help="default: all three")
+    parser.add_argument("--content-id", help="exam, test or interview id")
+    parser.add_argument("--tag", help="only content with this tag")
+    parser.add_argument("--since", help="ISO date/time, inclusive")
+    parser.add_argument("--until", help="ISO date/time, exclusive")
+    parser.add_argument("--format", choices=list(FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args))
+    except HTTPException as e:
+        raise SystemExit(e.detail)
+
+
+if __name__ == "__main__":
+    main()
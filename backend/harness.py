@@ -0,0 +1,270 @@
+# backend/harness.py
+# Multi-case harness for Python coding questions. Instead of one Judge0
+# submission per test case, build_submission() wraps the candidate's code in
+# a driver that runs it once per case inside a single submission: each case
+# runs in its own forked child with its own stdin, captured stdout/stderr,
+# fresh globals and a wall-clock limit, and the driver prints one JSON record
+# per case. split_result() turns the submission's output back into one
+# Judge0-shaped result per case, so callers counting "Accepted" results
+# don't change.
+#
+# Candidate code never runs in the driver process, but it can still write to
+# the submission's stdout (through /proc) or kill the driver. So every record
+# is signed with an HMAC key that arrives on stdin: the driver reads it before
+# the first case and wipes it in each child before the candidate's code
+# runs, and only signs once every child has exited. The driver finishes with
+# a signed end record; without one, cases it didn't report count as failed.
+# Expected outputs never go into the driver either; they are compared here.
+import base64
+import hashlib
+import hmac
+import json
+import os
+from typing import List, Optional, Tuple
+
+from backend.utils import SECRET_KEY
+
+EXECUTION_HARNESS = os.getenv("EXECUTION_HARNESS", "false").lower() == "true"
+EXECUTION_HARNESS_CASE_SECONDS = float(os.getenv("EXECUTION_HARNESS_CASE_SECONDS", "2"))
+# Judge0's default max_cpu_time_limit/max_wall_time_limit; a harness run is capped there however many cases it has
+HARNESS_MAX_CPU_SECONDS = float(os.getenv("HARNESS_MAX_CPU_SECONDS", "15"))
+HARNESS_MAX_WALL_SECONDS = float(os.getenv("HARNESS_MAX_WALL_SECONDS", "20"))
+# Signs the per-run record keys; defaults to the JWT secret so every API process derives the same ones
+HARNESS_SECRET = os.getenv("HARNESS_SECRET") or SECRET_KEY
+
+HARNESS_LANGUAGE_IDS = {71}  # Python 3
+
+STATUSES = {3: "Accepted", 4: "Wrong Answer", 5: "Time Limit Exceeded", 6: "Compilation Error", 11: "Runtime Error (NZEC)"}
+
+# Kept to the stdlib and to constructs every Python 3 Judge0 image supports
+DRIVER = r"""
+import base64, hashlib, hmac, io, json, os, select, signal, sys, time, traceback
+
+SOURCE = base64.b64decode("{source}").decode("utf-8", "replace")
+CASES = json.loads(base64.b64decode("{cases}").decode("utf-8"))
+TIMEOUT = {timeout}
+BUDGET = {budget}
+LIMIT = 65536
+
+
+def read_key():
+    # Straight into a bytearray, so children can wipe the only copy
+    key = bytearray({key_length})
+    view, filled = memoryview(key), 0
+    while filled < len(key):
+        count = os.readv(0, [view[filled:]])
+        if not count:
+            break
+        filled += count
+    view.release()
+    null = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null, 0)
+    os.close(null)
+    return key
+
+
+def run_child(code, case, key, stdout_w, stderr_w):
+    # Never returns
+    failed = True
+    try:
+        key[:] = bytes(len(key))
+        os.setsid()
+        os.dup2(stdout_w, 1)
+        os.dup2(stderr_w, 2)
+        os.closerange(3, 1024)
+        sys.stdin = io.TextIOWrapper(io.BytesIO(case["input"].encode("utf-8")), encoding="utf-8", newline=None)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+        try:
+            exec(code, {{"__name__": "__main__", "__builtins__": __builtins__}})
+            failed = False
+        except SystemExit as e:
+            failed = e.code not in (None, 0)
+            if failed and not isinstance(e.code, int):
+                print(e.code, file=sys.stderr)
+        except BaseException:
+            etype, value, tb = sys.exc_info()
+            traceback.print_exception(etype, value, tb.tb_next)
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+    finally:
+        os._exit(1 if failed else 0)
+
+
+def run_case(index, code, key, deadline):
+    start = time.monotonic()
+    limit = min(deadline, start + TIMEOUT)
+    if limit <= start:
+        return {{"case": index, "status": 5, "time": 0, "stdout": "", "stderr": ""}}
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        run_child(code, CASES[index], key, stdout_w, stderr_w)
+    os.close(stdout_w)
+    os.close(stderr_w)
+    output = {{stdout_r: bytearray(), stderr_r: bytearray()}}
+    readers = [stdout_r, stderr_r]
+    timed_out, wait_status = False, None
+    while wait_status is None:
+        remaining = limit - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        if not readers:
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                wait_status = status
+            else:
+                time.sleep(min(remaining, 0.005))
+            continue
+        for fd in select.select(readers, [], [], remaining)[0]:
+            data = os.read(fd, 65536)
+            if not data:
+                readers.remove(fd)
+            elif fd == stdout_r:
+                output[fd] += data[:LIMIT - len(output[fd])]
+            else:
+                output[fd] += data
+                del output[fd][:-LIMIT]
+    elapsed = time.monotonic() - start
+    try:
+        os.killpg(pid, signal.SIGKILL)  # a timed-out case, and anything it left running
+    except OSError:
+        pass
+    if wait_status is None:
+        wait_status = os.waitpid(pid, 0)[1]
+    os.close(stdout_r)
+    os.close(stderr_r)
+    if timed_out:
+        status = 5
+    elif os.WIFEXITED(wait_status) and os.WEXITSTATUS(wait_status) == 0:
+        status = 3
+    else:
+        status = 11
+    return {{"case": index, "status": status, "time": round(elapsed, 3),
+             "stdout": output[stdout_r].decode("utf-8", "replace"),
+             "stderr": output[stderr_r].decode("utf-8", "replace")}}
+
+
+def main():
+    deadline = time.monotonic() + BUDGET
+    key = read_key()
+    records = []
+    try:
+        code = compile(SOURCE, "main.py", "exec")
+    except (SyntaxError, ValueError):
+        records.append({{"compile_error": traceback.format_exc(limit=0)[-LIMIT:]}})
+    else:
+        for index in range(len(CASES)):
+            records.append(run_case(index, code, key, deadline))
+    records.append({{"end": len(CASES)}})
+    for record in records:
+        body = json.dumps(record)
+        sys.stdout.write(hmac.new(key, body.encode("utf-8"), hashlib.sha256).hexdigest() + " " + body + "\n")
+    sys.stdout.flush()
+
+
+main()
+"""
+
+
+def _b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
+
+
+def supports(language_id: int, test_cases: list) -> bool:
+    return EXECUTION_HARNESS and language_id in HARNESS_LANGUAGE_IDS and len(test_cases) > 1
+
+
+def build_submission(source_code: str, language_id: int, test_cases: List[dict]) -> Tuple[dict, str]:
+    """One submission running every case, and the key its records are signed with.
+
+    source_code is base64, like the per-case requests.
+    """
+    cases = _b64(json.dumps([{"input": tc.get("input", "")} for tc in test_cases]))
+    # Derived from the content rather than random, so identical runs share an execution cache entry
+    key = hmac.new(HARNESS_SECRET.encode("utf-8"), f"harness:{source_code}:{cases}".encode("ascii"), hashlib.sha256).hexdigest()
+    budget = EXECUTION_HARNESS_CASE_SECONDS * len(test_cases) + 1
+    wall = min(HARNESS_MAX_WALL_SECONDS, budget)
+    driver = DRIVER.format(
+        source=source_code,
+        cases=cases,
+        timeout=EXECUTION_HARNESS_CASE_SECONDS,
+        budget=max(0.0, wall - 1),  # leaves the driver time to report before Judge0 stops it
+        key_length=len(key),
+    )
+    submission = {
+        "source_code": _b64(driver),
+        "language_id": language_id,
+        "stdin": _b64(key),
+        "cpu_time_limit": min(HARNESS_MAX_CPU_SECONDS, budget),
+        "wall_time_limit": wall,
+    }
+    return submission, key
+
+
+def _status(status_id: int) -> dict:
+    return {"id": status_id, "description": STATUSES[status_id]}
+
+
+def _verified(stdout: str, key: str) -> List[dict]:
+    """The driver's records: lines whose signature checks out, in order."""
+    records = []
+    for line in stdout.splitlines():
+        signature, _, body = line.partition(" ")
+        expected = hmac.new(key.encode("ascii"), body.encode("utf-8"), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            continue  # the candidate's own output, or a forgery
+        records.append(json.loads(body))
+    return records
+
+
+def split_result(result: dict, key: str, test_cases: List[dict], compare_output: bool) -> List[dict]:
+    """Per-case Judge0-shaped results from the harness submission's result.
+
+    With compare_output, a case that ran cleanly is Accepted only if its
+    stdout matches the expected output, ignoring trailing whitespace as Judge0 does.
+    """
+    case_count = len(test_cases)
+    stdout = base64.b64decode(result.get("stdout") or "").decode("utf-8", errors="replace")
+    records = {}
+    compile_error: Optional[str] = None
+    ended = False
+    for record in _verified(stdout, key):
+        if "end" in record:
+            ended = True
+        elif "compile_error" in record:
+            compile_error = record["compile_error"]
+        else:
+            records[record["case"]] = record
+
+    if compile_error is not None:
+        failed = {"stdout": None, "stderr": None, "compile_output": _b64(compile_error), "status": _status(6)}
+        return [dict(failed) for _ in range(case_count)]
+
+    # Without the end record the driver was cut short (killed, or over the run's limits): cases
+    # it didn't report take the run's own verdict, or a runtime error if the run claims success
+    overall = result.get("status") or _status(11)
+    if ended or overall.get("id") == 3:
+        overall = _status(11)
+    results = []
+    for index in range(case_count):
+        record = records.get(index)
+        if record is None:
+            results.append({"stdout": None, "stderr": result.get("stderr"), "status": dict(overall)})
+            continue
+        status_id = record["status"]
+        expected = test_cases[index].get("output")
+        if status_id == 3 and compare_output and expected is not None and record["stdout"].rstrip() != expected.rstrip():
+            status_id = 4
+        results.append({
+            "stdout": _b64(record["stdout"]) if record["stdout"] else None,
+            "stderr": _b64(record["stderr"]) if record["stderr"] else None,
+            "time": str(record["time"]),
+            "status": _status(status_id),
+        })
+    return results
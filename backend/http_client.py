@@ -0,0 +1,116 @@
+# backend/http_client.py
+# One pooled httpx client for all outbound execution calls, opened in the
+# startup hook and closed on shutdown, so Judge0/RapidAPI connections are
+# reused across runs instead of re-handshaking for every request.
+import os
+import time
+
+import httpx
+from backend import metrics
+
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "20"))
+HTTP_POOL_KEEPALIVE_SECONDS = float(os.getenv("HTTP_POOL_KEEPALIVE_SECONDS", "30"))
+HTTP_POOL_ACQUIRE_TIMEOUT = float(os.getenv("HTTP_POOL_ACQUIRE_TIMEOUT", "5"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+# Per-upstream timeouts. The self-hosted Judge0 is called with wait=true, so its
+# read timeout has to cover a full execution.
+UPSTREAM_TIMEOUTS = {
+    "judge0": httpx.Timeout(
+        connect=5.0, read=float(os.getenv("JUDGE0_READ_TIMEOUT", "30")), write=10.0, pool=HTTP_POOL_ACQUIRE_TIMEOUT
+    ),
+    "rapidapi": httpx.Timeout(
+        connect=5.0, read=float(os.getenv("RAPIDAPI_READ_TIMEOUT", "20")), write=10.0, pool=HTTP_POOL_ACQUIRE_TIMEOUT
+    ),
+}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401  (optional dependency: pip install httpx[http2])
+        return True
+    except ImportError:
+        print("HTTP2_ENABLED is set but the h2 package is not installed; using HTTP/1.1")
+        return False
+
+
+class OutboundClient:
+    """Shared connection pool plus in-flight/saturation counters for sizing it."""
+
+    def __init__(self):
+        self.limits = httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_POOL_KEEPALIVE_SECONDS,
+        )
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0  # requests that started with every pool slot already busy
+        self.pool_timeouts = 0
+        self._timers = {name: metrics.OperationTimer() for name in UPSTREAM_TIMEOUTS}
+        self._client = None
+
+    def open(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=HTTP2_ENABLED and _http2_available(),
+                timeout=UPSTREAM_TIMEOUTS["rapidapi"],
+            )
+        return self._client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.open()
+
+    async def request(self, upstream: str, method: str, url: str, **kwargs) -> httpx.Response:
+        kwargs.setdefault("timeout", UPSTREAM_TIMEOUTS[upstream])
+        if self.in_flight >= HTTP_POOL_MAX_CONNECTIONS:
+            self.saturated += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            failed = False
+            return response
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._timers[upstream].observe(time.perf_counter() - start, error=failed)
+
+    async def post(self, upstream: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(upstream, "POST", url, **kwargs)
+
+    async def get(self, upstream: str, url: str, **kwargs) -> httpx.Response:
+        return await self.request(upstream, "GET", url, **kwargs)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+            "max_keepalive": HTTP_POOL_MAX_KEEPALIVE,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "utilization": round(self.in_flight / HTTP_POOL_MAX_CONNECTIONS, 4),
+            "saturated_requests": self.saturated,
+            "pool_timeouts": self.pool_timeouts,
+            "upstreams": {name: timer.snapshot() for name, timer in self._timers.items()},
+        }
+
+
+outbound = OutboundClient()
+metrics.register("http_pool", outbound.stats)
+
+
+def get_outbound_client() -> OutboundClient:
+    """FastAPI dependency for routes that call out to the execution service."""
+    return outbound
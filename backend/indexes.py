@@ -0,0 +1,111 @@
+# backend/indexes.py
+# Declarative index registry. Applied from the startup hook in server.py;
+# the /ready endpoint reports not-ready until every required index exists.
+import os
+from typing import List, NamedTuple, Optional, Tuple
+from pymongo.errors import PyMongoError
+
+ASCENDING = 1
+DESCENDING = -1
+
+
+class IndexSpec(NamedTuple):
+    collection: str
+    keys: List[Tuple[str, int]]
+    name: str
+    unique: bool = False
+    sparse: bool = False
+    required: bool = True
+    expire_after_seconds: Optional[int] = None
+
+
+INDEXES: List[IndexSpec] = [
+    # Signup relies on these to reject duplicates with a single insert
+    IndexSpec("users", [("username", ASCENDING)], "username_unique", unique=True),
+    IndexSpec("users", [("email", ASCENDING)], "email_unique", unique=True),
+    # Per-user history pages, newest first
+    IndexSpec("results", [("user_id", ASCENDING), ("submitted_at", DESCENDING)], "user_submitted_at"),
+    IndexSpec("attempts", [("user_id", ASCENDING), ("submitted_at", DESCENDING)], "user_submitted_at"),
+    IndexSpec("interview_results", [("user_id", ASCENDING), ("submitted_at", DESCENDING)], "user_submitted_at"),
+    IndexSpec("certifications", [("user_id", ASCENDING), ("awarded_at", DESCENDING)], "user_awarded_at"),
+    # Leaderboards load each user's best score per exam/test from the index alone
+    IndexSpec("results", [("exam_id", ASCENDING), ("user_id", ASCENDING), ("score", DESCENDING)], "exam_user_score"),
+    IndexSpec("attempts", [("test_id", ASCENDING), ("user_id", ASCENDING), ("score", DESCENDING)], "test_user_score"),
+    # Batch jobs (item analysis, re-grades) walk one exam's/test's submissions in _id order from a watermark
+    IndexSpec("results", [("exam_id", ASCENDING), ("_id", ASCENDING)], "exam_id_id", required=False),
+    IndexSpec("attempts", [("test_id", ASCENDING), ("_id", ASCENDING)], "test_id_id", required=False),
+    IndexSpec("question_stats", [("kind", ASCENDING), ("content_id", ASCENDING)], "kind_content_id", required=False),
+    # Session lookups filter on _id plus the owner; the owner index serves "my sessions" queries
+    IndexSpec("exam_sessions", [("user_id", ASCENDING), ("start_time", DESCENDING)], "user_start_time", required=False),
+    IndexSpec("interview_sessions", [("user_id", ASCENDING), ("start_time", DESCENDING)], "user_start_time", required=False),
+    # Grading workers claim queued jobs by due time, and recover running jobs whose lease lapsed
+    IndexSpec("grading_jobs", [("status", ASCENDING), ("available_at", ASCENDING)], "status_available_at"),
+    IndexSpec("grading_jobs", [("status", ASCENDING), ("lease_expires_at", ASCENDING)], "status_lease_expires_at"),
+    # Documents written by a grading job carry its id, so a retried job finds them instead of inserting twice
+    IndexSpec("attempts", [("grading_job_id", ASCENDING)], "grading_job_id_unique", unique=True, sparse=True),
+    IndexSpec("results", [("grading_job_id", ASCENDING)], "grading_job_id_unique", unique=True, sparse=True),
+    IndexSpec("certifications", [("grading_job_id", ASCENDING)], "grading_job_id_unique", unique=True, sparse=True),
+    # Persistent tier of the execution result cache ages out on its own
+    IndexSpec(
+        "execution_results", [("created_at", ASCENDING)], "created_at_ttl", required=False,
+        expire_after_seconds=int(os.getenv("EXECUTION_CACHE_PERSISTENT_TTL_SECONDS", str(7 * 24 * 3600))),
+    ),
+]
+
+# Last bootstrap outcome, served by /ready
+index_status = {"ready": False, "created": [], "failed": [], "missing": [], "unused": []}
+
+
+async def ensure_indexes(db) -> dict:
+    """Creates every registered index, then verifies what actually exists."""
+    created, failed = [], []
+    for spec in INDEXES:
+        try:
+            options = {"name": spec.name, "unique": spec.unique, "sparse": spec.sparse}
+            if spec.expire_after_seconds is not None:
+                options["expireAfterSeconds"] = spec.expire_after_seconds
+            await db[spec.collection].create_index(spec.keys, **options)
+            created.append(f"{spec.collection}.{spec.name}")
+        except PyMongoError as e:
+            failed.append({"index": f"{spec.collection}.{spec.name}", "required": spec.required, "error": str(e)})
+
+    report = await verify_indexes(db)
+    index_status.update(
+        ready=not any(f["required"] for f in failed) and not report["missing_required"],
+        created=created,
+        failed=failed,
+        missing=report["missing"],
+        unused=report["unused"],
+    )
+    return index_status
+
+
+async def verify_indexes(db) -> dict:
+    """Lists registered indexes that don't exist and existing ones with no recorded use."""
+    missing, missing_required, unused = [], [], []
+    by_collection = {}
+    for spec in INDEXES:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    for collection, specs in by_collection.items():
+        try:
+            existing = await db[collection].index_information()
+        except PyMongoError:
+            existing = {}
+        for spec in specs:
+            info = existing.get(spec.name)
+            if info is None or [tuple(k) for k in info["key"]] != [tuple(k) for k in spec.keys]:
+                missing.append(f"{collection}.{spec.name}")
+                if spec.required:
+                    missing_required.append(f"{collection}.{spec.name}")
+
+        # $indexStats counters reset on mongod restart, so "unused" means "unused since then"
+        try:
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None)
+        except PyMongoError:
+            continue
+        for stat in stats:
+            if stat["name"] != "_id_" and stat.get("accesses", {}).get("ops", 0) == 0:
+                unused.append(f"{collection}.{stat['name']}")
+
+    return {"missing": missing, "missing_required": missing_required, "unused": unused}
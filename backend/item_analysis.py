@@ -0,0 +1,272 @@
+# backend/item_analysis.py
+# python -m backend.item_analysis [--kind exam|test] [--content-id ID] [--full] [--batch-size 1000]
+#
+# Per-question statistics for spotting questions to fix or retire:
+#   p_value         mean credit (for right/wrong questions, the fraction correct)
+#   discrimination  corrected point-biserial: correlation between the item and
+#                   the rest of the submission's score (total minus this item)
+#   distractors     share of answered MCQ responses choosing each option
+#   case_pass_rates per hidden test case of an exam coding question, from case_stats
+#
+# Stored results/attempts are streamed in batches into a (submissions x
+# questions) credit matrix and an MCQ choice matrix; each batch adds its
+# column sums (n, sum x, sum x^2, sum t, sum t^2, sum x*t, with t the row
+# total) and option counts for every question in a few NumPy reductions. The
+# sums are kept in `question_stats`, so a later run only reads submissions
+# past the stored watermark and adds them in. A changed question set, answer
+# key or test case (a new content key_version) triggers a full recompute.
+import argparse
+import asyncio
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+from backend import content_index, database
+from backend.case_stats import case_key, case_stats_collection
+
+# Submissions newer than this are left for the next run, so ones still being written aren't skipped past
+ITEM_ANALYSIS_LAG_SECONDS = float(os.getenv("ITEM_ANALYSIS_LAG_SECONDS", "300"))
+
+question_stats_collection = database.db["question_stats"]
+
+# kind -> (submissions, content id field, content index, content collection)
+SOURCES = {
+    "exam": (database.results_collection, "exam_id", content_index.exams, database.exams_collection),
+    "test": (database.attempts_collection, "test_id", content_index.tests, database.tests_collection),
+}
+
+SUMS = ("n", "sx", "sxx", "st", "stt", "sxt")
+OTHER, UNANSWERED = "__other__", "__unanswered__"
+
+
+def _credit(kind: str, doc: dict, question: content_index.QuestionRecord) -> float:
+    """The submission's credit on one question, or NaN when it can't be known."""
+    if kind == "exam":
+        detail = (doc.get("details") or {}).get(question.id)
+        if detail is None:
+            # Unanswered coding questions get no detail and count as wrong
+            return 0.0 if question.question_type == "coding" else np.nan
+        if detail.get("error"):
+            return np.nan  # grading failed; says nothing about the question
+        return 1.0 if detail.get("is_correct") else 0.0
+    scores = doc.get("question_scores")
+    if scores is not None:
+        return float(scores.get(question.id, 0.0))
+    # Attempts from before per-question scores were stored: MCQs can be re-derived, coding can't
+    if question.question_type == "mcq":
+        answer = (doc.get("answers") or {}).get(question.id)
+        return 1.0 if answer and answer == question.correct_answer else 0.0
+    return np.nan
+
+
+def _choice(kind: str, doc: dict, question: content_index.QuestionRecord) -> Optional[str]:
+    answer = (doc.get("answers") or {}).get(question.id)
+    if answer is None and kind == "exam":
+        answer = ((doc.get("details") or {}).get(question.id) or {}).get("user_answer")
+    return answer or None
+
+
+class Analysis:
+    """Running sums for every question of one exam or test."""
+
+    def __init__(self, kind: str, record: content_index.ContentRecord):
+        self.kind = kind
+        self.record = record
+        self.questions = list(record.questions)
+        self.mcqs = [q for q in self.questions if q.question_type == "mcq"]
+        # Option slots per MCQ: its options, then "other" and "unanswered"
+        self.width = max((len(q.options) for q in self.mcqs), default=0) + 2
+        self.sums = np.zeros((len(SUMS), len(self.questions)))
+        self.option_counts = np.zeros((len(self.mcqs), self.width), dtype=np.int64)
+        self.documents = 0
+
+    def _slot(self, question: content_index.QuestionRecord, option: Optional[str]) -> int:
+        if option is None:
+            return self.width - 1
+        try:
+            return question.options.index(option)
+        except ValueError:
+            return self.width - 2
+
+    def add(self, docs: List[dict]):
+        credit = np.array([[_credit(self.kind, doc, q) for q in self.questions] for doc in docs], dtype=float)
+        credit = credit.reshape(len(docs), len(self.questions))
+        known = ~np.isnan(credit)
+        x = np.where(known, credit, 0.0)
+        t = x.sum(axis=1, keepdims=True)  # submission total over the questions we know
+        self.sums += np.stack([
+            known.sum(axis=0), x.sum(axis=0), (x * x).sum(axis=0),
+            (known * t).sum(axis=0), (known * t * t).sum(axis=0), (x * t).sum(axis=0),
+        ])
+
+        if self.mcqs:
+            slots = np.array([[self._slot(q, _choice(self.kind, doc, q)) for q in self.mcqs] for doc in docs])
+            slots = slots.reshape(len(docs), len(self.mcqs))
+            # One bincount over (question, slot) pairs covers every MCQ at once
+            flat = (np.arange(len(self.mcqs)) * self.width + slots).ravel()
+            self.option_counts += np.bincount(flat, minlength=len(self.mcqs) * self.width).reshape(len(self.mcqs), self.width)
+        self.documents += len(docs)
+
+    def load(self, stored: Dict[str, dict]):
+        """Starts from the sums a previous run stored."""
+        for j, q in enumerate(self.questions):
+            doc = stored.get(q.id)
+            if doc:
+                self.sums[:, j] = [doc["sums"].get(name, 0.0) for name in SUMS]
+        for m, q in enumerate(self.mcqs):
+            for entry in (stored.get(q.id) or {}).get("option_counts") or []:
+                option, count = entry["option"], entry["count"]
+                if option == UNANSWERED:
+                    slot = self.width - 1
+                elif option == OTHER:
+                    slot = self.width - 2
+                else:
+                    slot = self._slot(q, option)  # options removed since fall into "other"
+                self.option_counts[m, slot] += count
+
+    def statistics(self) -> Dict[str, dict]:
+        """Derived statistics per question id, computed for all questions together."""
+        n, sx, sxx, st, stt, sxt = self.sums
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = sx / n
+            mean_t = st / n
+            var_x = sxx / n - p * p
+            var_t = stt / n - mean_t * mean_t
+            cov_xt = sxt / n - p * mean_t
+            # Against the rest score r = t - x, so the item doesn't correlate with itself
+            cov_xr = cov_xt - var_x
+            var_r = var_t - 2 * cov_xt + var_x
+            discrimination = cov_xr / np.sqrt(var_x * var_r)
+
+        def number(value) -> Optional[float]:
+            return round(float(value), 4) if np.isfinite(value) else None
+
+        stats = {}
+        for j, q in enumerate(self.questions):
+            stats[q.id] = {
+                "question_type": q.question_type,
+                "responses": int(n[j]),
+                "p_value": number(p[j]),
+                "discrimination": number(discrimination[j]),
+                "sums": {name: float(self.sums[i, j]) for i, name in enumerate(SUMS)},
+            }
+        for m, q in enumerate(self.mcqs):
+            counts = self.option_counts[m]
+            answered, total = int(counts[:-1].sum()), int(counts.sum())
+            # Lists rather than option-keyed objects: option text can contain "." or start with "$"
+            labelled = [(option, counts[slot]) for slot, option in enumerate(q.options)]
+            stats[q.id]["option_counts"] = [
+                {"option": option, "count": int(count)}
+                for option, count in labelled + [(OTHER, counts[-2]), (UNANSWERED, counts[-1])] if count
+            ]
+            stats[q.id]["distractors"] = [
+                {"option": option, "rate": round(float(count) / answered, 4) if answered else None}
+                for option, count in labelled if option != q.correct_answer
+            ]
+            stats[q.id]["other_rate"] = round(float(counts[-2]) / answered, 4) if answered else None
+            stats[q.id]["unanswered_rate"] = round(float(counts[-1]) / total, 4) if total else None
+        return stats
+
+
+async def _case_pass_rates(content_id: str, question: content_index.QuestionRecord) -> List[dict]:
+    doc = await case_stats_collection.find_one({"_id": f"{content_id}:{question.id}"}) or {}
+    cases = doc.get("cases", {})
+    rates = []
+    for index, case in enumerate(question.hidden_cases):
+        entry = cases.get(case_key(case), {})
+        runs = entry.get("runs", 0)
+        rates.append({
+            "case": index,
+            "runs": runs,
+            "pass_rate": round((runs - entry.get("failures", 0)) / runs, 4) if runs else None,
+        })
+    return rates
+
+
+async def analyze(kind: str, content_id: str, full: bool, batch_size: int) -> dict:
+    collection, field, index, _ = SOURCES[kind]
+    record = await index.get(content_id)
+    if record is None:
+        return {"content_id": content_id, "skipped": "not found"}
+
+    stored = {
+        doc["question_id"]: doc
+        for doc in await question_stats_collection.find({"kind": kind, "content_id": content_id}).to_list(length=None)
+    }
+    # Every question's document is written together, so they should agree on one watermark and key version
+    marks = {(doc.get("watermark"), doc.get("key_version")) for doc in stored.values()}
+    watermark = None
+    incremental = not full and len(marks) == 1 and next(iter(marks))[1] == record.key_version \
+        and set(stored) == {q.id for q in record.questions}
+    analysis = Analysis(kind, record)
+    if incremental:
+        watermark = next(iter(marks))[0]
+        analysis.load(stored)
+
+    upper = ObjectId.from_datetime(datetime.utcnow() - timedelta(seconds=ITEM_ANALYSIS_LAG_SECONDS))
+    query = {field: content_id, "_id": {"$lt": upper}}
+    if watermark is not None:
+        query["_id"]["$gte"] = watermark
+    fields = {"details": 1, "answers": 1, "question_scores": 1}
+    batch = []
+    async for doc in collection.find(query, fields).sort("_id", 1).batch_size(batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            analysis.add(batch)
+            batch = []
+    if batch:
+        analysis.add(batch)
+
+    now = datetime.utcnow()
+    stats = analysis.statistics()
+    operations = []
+    for question in record.questions:
+        doc = stats[question.id]
+        if question.question_type == "coding" and kind == "exam":
+            doc["case_pass_rates"] = await _case_pass_rates(content_id, question)
+        operations.append(UpdateOne(
+            {"_id": f"{kind}:{content_id}:{question.id}"},
+            {"$set": {
+                **doc, "kind": kind, "content_id": content_id, "question_id": question.id,
+                "watermark": upper, "key_version": record.key_version, "updated_at": now,
+            }},
+            upsert=True,
+        ))
+    if operations:
+        await question_stats_collection.bulk_write(operations, ordered=True)
+    # Questions that were removed from the content
+    await question_stats_collection.delete_many({
+        "kind": kind, "content_id": content_id, "question_id": {"$nin": [q.id for q in record.questions]},
+    })
+    return {"content_id": content_id, "mode": "incremental" if incremental else "full", "documents": analysis.documents}
+
+
+async def run(kinds: List[str], content_id: Optional[str], full: bool, batch_size: int):
+    start = time.perf_counter()
+    reports = []
+    for kind in kinds:
+        ids = [content_id] if content_id else [str(_id) for _id in await SOURCES[kind][3].distinct("_id")]
+        for cid in ids:
+            reports.append({"kind": kind, **await analyze(kind, cid, full, batch_size)})
+    print(json.dumps({"seconds": round(time.perf_counter() - start, 2), "contents": reports}, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute per-question difficulty and discrimination statistics.")
+    parser.add_argument("--kind", choices=list(SOURCES), help="default: exams and tests")
+    parser.add_argument("--content-id", help="one exam or test (requires --kind)")
+    parser.add_argument("--full", action="store_true", help="recompute from every submission, ignoring the watermark")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    if args.content_id and not args.kind:
+        parser.error("--content-id requires --kind")
+    asyncio.run(run([args.kind] if args.kind else list(SOURCES), args.content_id, args.full, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
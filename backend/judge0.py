@@ -0,0 +1,249 @@
+# backend/judge0.py
+# Batch execution against Judge0, hosted (RapidAPI) or self-hosted
+# (JUDGE0_URL). Submissions are created as one batch and then awaited until
+# every token reaches a terminal status: by polling with exponential backoff,
+# or, in callback mode, by Judge0 calling back into /api/judge0/callback with
+# a fallback poll for any callback that never arrives. A batch shared by
+# several requests can resolve one future per submission, each as soon as
+# that submission is done, so one slow or failed run doesn't hold up the rest.
+#
+# The self-hosted Judge0 can also be used synchronously (run_self_hosted):
+# one wait=true request per case, several at a time.
+import asyncio
+import base64
+import os
+import random
+import secrets
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from backend import metrics
+from backend.resilience import ConfigurationError
+from backend.cache import TTLCache
+from backend.http_client import OutboundClient
+
+RAPIDAPI_URL = "https://judge0-ce.p.rapidapi.com"
+RAPIDAPI_HOST = "judge0-ce.p.rapidapi.com"
+RESULT_FIELDS = "token,stdout,stderr,status"
+
+JUDGE0_POLL_INITIAL_SECONDS = float(os.getenv("JUDGE0_POLL_INITIAL_SECONDS", "0.25"))
+JUDGE0_POLL_MAX_SECONDS = float(os.getenv("JUDGE0_POLL_MAX_SECONDS", "2"))
+JUDGE0_COMPLETION_DEADLINE_SECONDS = float(os.getenv("JUDGE0_COMPLETION_DEADLINE_SECONDS", "30"))
+JUDGE0_COMPLETION_MODE = os.getenv("JUDGE0_COMPLETION_MODE", "poll")  # "poll" or "callback"
+# Externally reachable base URL of this API, e.g. https://api.example.com (callback mode only)
+JUDGE0_CALLBACK_BASE_URL = os.getenv("JUDGE0_CALLBACK_BASE_URL", "")
+JUDGE0_CALLBACK_WAIT_SECONDS = float(os.getenv("JUDGE0_CALLBACK_WAIT_SECONDS", "10"))
+
+JUDGE0_URL = os.getenv("JUDGE0_URL", "http://localhost:2358")  # self-hosted Judge0 API
+JUDGE0_CASE_CONCURRENCY = int(os.getenv("JUDGE0_CASE_CONCURRENCY", "5"))  # per request
+JUDGE0_MAX_CONCURRENCY = int(os.getenv("JUDGE0_MAX_CONCURRENCY", "20"))  # across all requests
+
+# Judge0 status ids 1 (In Queue) and 2 (Processing) are the only non-terminal ones
+PENDING_STATUS_IDS = (1, 2)
+
+# Part of the callback URL so only Judge0 (which we gave the URL to) can post results
+CALLBACK_SECRET = os.getenv("JUDGE0_CALLBACK_SECRET") or secrets.token_urlsafe(16)
+
+# Caps in-flight self-hosted Judge0 submissions for the whole process
+judge0_slots = asyncio.Semaphore(JUDGE0_MAX_CONCURRENCY)
+
+_waiters: Dict[str, asyncio.Future] = {}
+# Callbacks that arrive before the submitting coroutine has registered the token
+_early_callbacks = TTLCache(max_size=10000, ttl_seconds=60)
+
+_stats = {"polls": 0, "callbacks": 0, "callback_fallbacks": 0, "deadline_exceeded": 0}
+_completion_timer = metrics.OperationTimer()
+
+
+def rapidapi_headers() -> dict:
+    api_key = os.getenv("VITE_JUDGE0_API_KEY")
+    if not api_key:
+        raise ConfigurationError("Judge0 API key not configured on the server.")
+    return {"X-RapidAPI-Key": api_key, "X-RapidAPI-Host": RAPIDAPI_HOST}
+
+
+def check_configured(upstream: str):
+    """Raises ConfigurationError if the upstream can't be called as configured."""
+    _endpoint(upstream)
+
+
+def _endpoint(upstream: str) -> Tuple[str, dict]:
+    """Base URL and auth headers for an upstream name ("rapidapi" or "judge0")."""
+    if upstream == "rapidapi":
+        return RAPIDAPI_URL, rapidapi_headers()
+    return JUDGE0_URL, {}
+
+
+def _rejected(errors) -> dict:
+    """Result for a batch item Judge0 refused to create (it returns validation errors instead of a token)."""
+    message = base64.b64encode(str(errors).encode("utf-8")).decode("ascii")
+    return {"token": None, "stdout": None, "stderr": None, "message": message,
+            "status": {"id": 13, "description": "Internal Error"}}
+
+
+def is_terminal(result: dict) -> bool:
+    status = result.get("status")
+    return bool(status) and status.get("id") not in PENDING_STATUS_IDS
+
+
+def _callbacks_enabled() -> bool:
+    return JUDGE0_COMPLETION_MODE == "callback" and bool(JUDGE0_CALLBACK_BASE_URL)
+
+
+async def _fetch(client: OutboundClient, upstream: str, tokens: List[str]) -> Dict[str, dict]:
+    _stats["polls"] += 1
+    base_url, headers = _endpoint(upstream)
+    response = await client.get(
+        upstream,
+        f"{base_url}/submissions/batch?tokens={','.join(tokens)}&base64_encoded=true&fields={RESULT_FIELDS}",
+        headers=headers
+    )
+    response.raise_for_status()
+    return {sub["token"]: sub for sub in response.json()["submissions"]}
+
+
+async def _poll_until_done(client: OutboundClient, upstream: str, pending: List[str], results: Dict[str, dict],
+                           deadline: float, deliver: Callable[[], None]):
+    delay = JUDGE0_POLL_INITIAL_SECONDS
+    while pending:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        # Exponential backoff with jitter so a burst of submits doesn't poll in lockstep
+        await asyncio.sleep(min(remaining, delay * random.uniform(0.5, 1.0)))
+        fetched = await _fetch(client, upstream, pending)
+        results.update(fetched)
+        deliver()
+        pending = [token for token in pending if not is_terminal(results.get(token, {}))]
+        delay = min(delay * 2, JUDGE0_POLL_MAX_SECONDS)
+
+
+async def _wait_for_callbacks(tokens: List[str], results: Dict[str, dict], deadline: float,
+                              deliver: Callable[[], None]) -> List[str]:
+    """Waits for callbacks up to JUDGE0_CALLBACK_WAIT_SECONDS and returns the tokens still pending."""
+    loop = asyncio.get_running_loop()
+    futures = {}
+    for token in tokens:
+        early = _early_callbacks.get(token)
+        if early is not None:
+            _early_callbacks.invalidate(token)
+            results[token] = early
+        else:
+            futures[token] = _waiters[token] = loop.create_future()
+    deliver()
+    try:
+        waiting = set(futures.values())
+        until = time.monotonic() + max(0.0, min(JUDGE0_CALLBACK_WAIT_SECONDS, deadline - time.monotonic()))
+        while waiting and time.monotonic() < until:
+            _, waiting = await asyncio.wait(waiting, timeout=until - time.monotonic(), return_when=asyncio.FIRST_COMPLETED)
+            for token, future in futures.items():
+                if future.done():
+                    results[token] = future.result()
+            deliver()
+    finally:
+        for token in futures:
+            _waiters.pop(token, None)
+    pending = [token for token in tokens if token not in results]
+    if pending:
+        _stats["callback_fallbacks"] += 1
+    return pending
+
+
+def resolve_callback(payload: dict):
+    """Entry point for Judge0's PUT to the callback URL."""
+    token = payload.get("token")
+    if not token or not is_terminal(payload):
+        return
+    _stats["callbacks"] += 1
+    result = {field: payload.get(field) for field in RESULT_FIELDS.split(",")}
+    waiter = _waiters.get(token)
+    if waiter is not None and not waiter.done():
+        waiter.set_result(result)
+    else:
+        _early_callbacks.set(token, result)
+
+
+async def run_batch(client: OutboundClient, submissions: List[dict], upstream: str = "rapidapi",
+                    futures: Optional[List[asyncio.Future]] = None) -> List[dict]:
+    """Submits a batch and returns one result per submission, in order, once all are terminal.
+
+    With futures (one per submission), each is resolved as soon as its own
+    submission is terminal; on an error or the deadline only the ones still
+    pending are failed. The call itself still raises, for the circuit breaker.
+    """
+    base_url, headers = _endpoint(upstream)
+    start = time.monotonic()
+    deadline = start + JUDGE0_COMPLETION_DEADLINE_SECONDS
+    use_callbacks = _callbacks_enabled()
+    if use_callbacks:
+        callback_url = f"{JUDGE0_CALLBACK_BASE_URL.rstrip('/')}/api/judge0/callback/{CALLBACK_SECRET}"
+        submissions = [{**sub, "callback_url": callback_url} for sub in submissions]
+    results: Dict[str, dict] = {}
+    tokens: List[str] = []
+
+    def deliver():
+        for token, future in zip(tokens, futures or ()):
+            if not future.done() and is_terminal(results.get(token, {})):
+                future.set_result(results[token])
+
+    def fail(error: HTTPException) -> HTTPException:
+        for future in futures or ():
+            if not future.done():
+                future.set_exception(error)
+                future.exception()  # mark retrieved if its caller already left
+        return error
+
+    try:
+        response = await client.post(
+            upstream,
+            f"{base_url}/submissions/batch?base64_encoded=true",
+            json={"submissions": submissions},
+            headers=headers
+        )
+        response.raise_for_status()
+        created = response.json()
+
+        # One invalid submission shouldn't fail the rest of a (possibly shared) batch
+        for index, item in enumerate(created):
+            if "token" not in item:
+                results[f"rejected-{index}"] = _rejected(item)
+        tokens.extend(item.get("token") or f"rejected-{index}" for index, item in enumerate(created))
+        pending = [token for token in tokens if token not in results]
+        if use_callbacks:
+            pending = await _wait_for_callbacks(pending, results, deadline, deliver)
+        deliver()
+        await _poll_until_done(client, upstream, pending, results, deadline, deliver)
+
+    except httpx.RequestError as e:
+        raise fail(HTTPException(status_code=503, detail=f"Could not connect to code execution service: {e}"))
+    except httpx.HTTPStatusError as e:
+        raise fail(HTTPException(status_code=e.response.status_code, detail=f"Error from code execution service: {e.response.text}"))
+    finally:
+        _completion_timer.observe(time.monotonic() - start)
+
+    if not all(is_terminal(results.get(token, {})) for token in tokens):
+        _stats["deadline_exceeded"] += 1
+        raise fail(HTTPException(status_code=504, detail="Code execution did not finish in time."))
+    return [results[token] for token in tokens]
+
+
+async def run_self_hosted(client: OutboundClient, submissions: List[dict]) -> List[dict]:
+    """Runs each submission on the self-hosted Judge0 with wait=true; results keep submission order."""
+    case_limit = asyncio.Semaphore(JUDGE0_CASE_CONCURRENCY)
+
+    async def run_case(payload):
+        async with case_limit, judge0_slots:
+            resp = await client.post("judge0", f"{JUDGE0_URL}/submissions?base64_encoded=true&wait=true", json=payload)
+        return resp.json()
+
+    return await asyncio.gather(*(run_case(payload) for payload in submissions))
+
+
+metrics.register("judge0", lambda: {
+    **_stats,
+    "mode": "callback" if _callbacks_enabled() else "poll",
+    "waiting": len(_waiters),
+    "completion": _completion_timer.snapshot(),
+})
@@ -0,0 +1,249 @@
+# backend/leaderboard.py
+# Per-exam and per-test rankings held in memory. Each board ranks users by
+# their best score. Scores are percentages with two decimals, so a board is
+# a Fenwick tree over 10001 score buckets (hundredths of a percent) holding
+# how many users sit in each. Rank, percentile and the k-th best score are
+# then O(log buckets) prefix-count queries, with no count_documents per view.
+#
+# Boards are loaded from Mongo on first use and by a warm-up at startup, then
+# kept current by record() as submissions are graded. Each process holds its
+# own boards, so they are also reloaded every LEADERBOARD_REFRESH_SECONDS to
+# pick up results graded by other processes. update() only ever raises a
+# user's best, so a re-grade that lowers scores calls changed(): it bumps the
+# board's counter in `leaderboard_versions`, and every process rebuilds that
+# board within LEADERBOARD_CHECK_SECONDS.
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo.errors import PyMongoError
+from backend import database, metrics
+
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+LEADERBOARD_CHECK_SECONDS = float(os.getenv("LEADERBOARD_CHECK_SECONDS", "5"))
+
+SCALE = 100  # buckets per percentage point
+BUCKETS = 100 * SCALE + 1
+
+# kind -> (collection, content id field)
+SOURCES = {
+    "exam": (database.results_collection, "exam_id"),
+    "test": (database.attempts_collection, "test_id"),
+}
+
+versions_collection = database.db["leaderboard_versions"]
+
+
+def _bucket(score: float) -> int:
+    return min(BUCKETS - 1, max(0, int(round(score * SCALE))))
+
+
+class FenwickTree:
+    """Counts per bucket with O(log n) updates, prefix sums and order-statistic search."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+        self._top_bit = 1 << (size.bit_length() - 1)
+
+    def add(self, index: int, delta: int):
+        self.total += delta
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index: int) -> int:
+        """Count in buckets [0, index]."""
+        count, i = 0, index + 1
+        while i > 0:
+            count += self.tree[i]
+            i -= i & -i
+        return count
+
+    def find(self, k: int) -> int:
+        """Smallest bucket whose prefix count reaches k (1-based)."""
+        position, step = 0, self._top_bit
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position  # tree index position + 1, i.e. bucket position
+
+
+class Leaderboard:
+    def __init__(self):
+        self.counts = FenwickTree(BUCKETS)
+        self.best: Dict[str, int] = {}  # user -> bucket
+        self.users_at: Dict[int, Set[str]] = {}
+
+    def update(self, user_id: str, score: float):
+        """Keeps the user's best score."""
+        bucket = _bucket(score)
+        current = self.best.get(user_id)
+        if current is not None:
+            if bucket <= current:
+                return
+            self.counts.add(current, -1)
+            self.users_at[current].discard(user_id)
+            if not self.users_at[current]:
+                del self.users_at[current]
+        self.best[user_id] = bucket
+        self.counts.add(bucket, 1)
+        self.users_at.setdefault(bucket, set()).add(user_id)
+
+    @property
+    def participants(self) -> int:
+        return self.counts.total
+
+    def standing(self, user_id: str) -> Optional[dict]:
+        bucket = self.best.get(user_id)
+        if bucket is None:
+            return None
+        at_or_below = self.counts.prefix(bucket)
+        n = self.participants
+        return {
+            "score": bucket / SCALE,
+            "rank": n - at_or_below + 1,  # users with the same score share a rank
+            "participants": n,
+            "percentile": round(at_or_below / n * 100, 2),  # share of users scoring at or below
+        }
+
+    def top(self, limit: int) -> List[Tuple[int, str, float]]:
+        """(rank, user_id, score) for the best `limit` users; ties are listed in user id order."""
+        entries = []
+        n = self.participants
+        while len(entries) < limit and len(entries) < n:
+            # The k-th best score is the (n - k + 1)-th smallest
+            bucket = self.counts.find(n - len(entries))
+            rank = len(entries) + 1
+            for user_id in sorted(self.users_at[bucket]):
+                entries.append((rank, user_id, bucket / SCALE))
+        return entries[:limit]
+
+
+class Leaderboards:
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._boards: Dict[Tuple[str, str], Leaderboard] = {}
+        self._pending: Dict[Tuple[str, str], List[Tuple[str, float]]] = {}  # updates recorded while a board loads
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._versions: Dict[Tuple[str, str], int] = {}  # changed() counters as of the last reload
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    async def _build(self, key: Tuple[str, str]) -> Leaderboard:
+        kind, content_id = key
+        collection, field = SOURCES[kind]
+        pending = self._pending.setdefault(key, [])
+        start = time.perf_counter()
+        try:
+            # Served from the (content id, user_id, score) index without touching documents
+            rows = await collection.aggregate([
+                {"$match": {field: content_id}},
+                {"$group": {"_id": "$user_id", "best": {"$max": "$score"}}},
+            ]).to_list(length=None)
+            board = Leaderboard()
+            for row in rows:
+                if row["_id"] and isinstance(row["best"], (int, float)):
+                    board.update(row["_id"], row["best"])
+            for user_id, score in pending:
+                board.update(user_id, score)
+            self._boards[key] = board
+        finally:
+            del self._pending[key]
+        self.loads += 1
+        self.load_seconds += time.perf_counter() - start
+        return board
+
+    async def _load(self, key: Tuple[str, str], reload: bool = False) -> Leaderboard:
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            board = self._boards.get(key)
+            if board is None or reload:
+                board = await self._build(key)
+        return board
+
+    async def board(self, kind: str, content_id: str) -> Leaderboard:
+        return self._boards.get((kind, content_id)) or await self._load((kind, content_id))
+
+    def record(self, kind: str, content_id: str, user_id: str, score: float):
+        """Applies a graded submission to the board, if this process has it."""
+        key = (kind, content_id)
+        board = self._boards.get(key)
+        if board is not None:
+            board.update(user_id, score)
+        if key in self._pending:
+            self._pending[key].append((user_id, score))
+        # Boards not loaded yet will read the stored submission when they are
+
+    async def load_all(self):
+        for kind, (collection, field) in SOURCES.items():
+            for content_id in await collection.distinct(field):
+                if content_id:
+                    await self._load((kind, content_id), reload=True)
+
+    async def _shared_versions(self) -> Dict[Tuple[str, str], int]:
+        return {
+            (doc["kind"], doc["content_id"]): doc["version"]
+            async for doc in versions_collection.find({}, {"kind": 1, "content_id": 1, "version": 1})
+        }
+
+    async def _reload_changed(self):
+        for key, version in (await self._shared_versions()).items():
+            if self._versions.get(key) == version:
+                continue
+            if key in self._boards:
+                await self._load(key, reload=True)
+            self._versions[key] = version  # a board loaded later reads the re-graded scores anyway
+
+    async def _refresh_loop(self):
+        next_full = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_full:
+                    versions = await self._shared_versions()  # read first, so a change during the load isn't missed
+                    await self.load_all()
+                    self._versions = versions
+                    next_full = time.monotonic() + self.refresh_seconds
+                else:
+                    await self._reload_changed()
+            except PyMongoError as e:
+                print(f"Leaderboard refresh failed: {e}")
+            await asyncio.sleep(min(LEADERBOARD_CHECK_SECONDS, self.refresh_seconds))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "boards": len(self._boards),
+            "participants": sum(board.participants for board in self._boards.values()),
+            "loads": self.loads,
+            "load_seconds": round(self.load_seconds, 3),
+        }
+
+
+async def changed(kind: str, content_id: str):
+    """Call after rewriting stored scores: every process rebuilds this board instead of only raising bests."""
+    await versions_collection.update_one(
+        {"_id": f"{kind}:{content_id}"},
+        {"$inc": {"version": 1}, "$set": {"kind": kind, "content_id": content_id, "updated_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+leaderboards = Leaderboards(LEADERBOARD_REFRESH_SECONDS)
+metrics.register("leaderboards", leaderboards.stats)
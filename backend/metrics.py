@@ -0,0 +1,44 @@
+# backend/metrics.py
+from typing import Callable, Dict
+
+# Subsystems register a zero-argument callable returning a JSON-safe dict;
+# the /metrics endpoint in server.py renders all of them in one snapshot, for
+# the accounts listed in METRICS_ALLOWED_EMAILS.
+_providers: Dict[str, Callable[[], dict]] = {}
+
+
+class OperationTimer:
+    """Call count and latency accumulator for a single named operation."""
+
+    __slots__ = ("count", "errors", "total_seconds", "max_seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float, error: bool = False):
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+    def snapshot(self) -> dict:
+        mean = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(mean * 1000, 3),
+            "max_ms": round(self.max_seconds * 1000, 3),
+        }
+
+
+def register(name: str, provider: Callable[[], dict]):
+    _providers[name] = provider
+
+
+def snapshot() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
@@ -3,6 +3,7 @@ from pydantic import BaseModel, EmailStr, Field, GetCoreSchemaHandler
 from pydantic_core import core_schema
 from datetime import datetime
 from bson import ObjectId
+from bson.errors import InvalidId
 from typing import List, Optional, Any, Dict
 
 # ====================================================================
@@ -22,9 +23,11 @@ class PyObjectId(ObjectId):
         def validate(value: Any) -> ObjectId:
             if isinstance(value, ObjectId):
                 return value
-            if ObjectId.is_valid(str(value)):
+            # Parse once; is_valid() followed by ObjectId() would parse twice
+            try:
                 return ObjectId(value)
-            raise ValueError("Invalid ObjectId")
+            except (InvalidId, TypeError):
+                raise ValueError("Invalid ObjectId")
 
         # Define the schema for Python instances
         python_schema = core_schema.chain_schema([
@@ -134,6 +137,25 @@ class TestModel(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
+# --- Catalog Summary Models ---
+class ContentSummaryModel(BaseModel):
+    id: str = Field(alias="_id")
+    title: str
+    description: Optional[str] = None
+    difficulty: Optional[str] = None
+    tags: List[str] = []
+    duration_minutes: Optional[int] = None
+    language: Optional[str] = None
+    pass_criteria: Optional[int] = None
+    question_count: int
+
+    class Config:
+        populate_by_name = True
+
+class ContentSummaryPage(BaseModel):
+    items: List[ContentSummaryModel]
+    next_cursor: Optional[str] = None
+
 # --- Session & Proctoring Models ---
 class ProctoringFlagModel(BaseModel):
     session_id: str
@@ -224,6 +246,19 @@ class AttemptResponse(BaseModel):
     test_title: Optional[str] = None
     total_questions: Optional[int] = None
 
+class HistoryItem(BaseModel):
+    id: str
+    type: str  # "exam", "test" or "interview"
+    content_id: Optional[str] = None
+    title: Optional[str] = None
+    score: Optional[float] = None  # percentage
+    raw_score: Optional[float] = None  # as stored: a percentage, or 1-5 for interviews
+    submitted_at: datetime
+
+class HistoryPage(BaseModel):
+    items: List[HistoryItem]
+    next_cursor: Optional[str] = None
+
 # --- Utility Models ---
 class TokenResponse(BaseModel):
     access_token: str
@@ -0,0 +1,84 @@
+# backend/pagination.py
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_cursor(position: dict) -> str:
+    """Packs a resume position into an opaque, URL-safe token."""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> dict:
+    if not cursor:
+        return {}
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+    if not isinstance(position, dict):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+    return position
+
+
+def decode_object_id(value) -> ObjectId:
+    if not isinstance(value, str) or not ObjectId.is_valid(value):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+    return ObjectId(value)
+
+
+def decode_datetime(value) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+
+def before_filter(position: dict, field: str) -> dict:
+    """Query clause for documents after a (field desc, _id desc) cursor position, or {} for the first page."""
+    if "at" not in position:
+        return {}
+    at, oid = decode_datetime(position["at"]), decode_object_id(position.get("id"))
+    return {"$or": [{field: {"$lt": at}}, {field: at, "_id": {"$lt": oid}}]}
+
+
+def before_cursor(doc: dict, field: str) -> str:
+    return encode_cursor({"at": doc[field].isoformat(), "id": str(doc["_id"])})
+
+
+async def summary_page(collection, fields: dict, limit: int, cursor: Optional[str]) -> dict:
+    """One page of card-sized content summaries in _id order.
+
+    Only the listed fields plus a question count leave the server, so the
+    question bodies, answers and test cases are never transferred.
+    """
+    position = decode_cursor(cursor)
+    pipeline = []
+    if "after" in position:
+        pipeline.append({"$match": {"_id": {"$gt": decode_object_id(position["after"])}}})
+    pipeline += [
+        {"$sort": {"_id": 1}},
+        {"$limit": limit + 1},
+        {"$project": {**{field: 1 for field in fields}, "question_count": {"$size": {"$ifNull": ["$questions", []]}}}},
+    ]
+    docs = await collection.aggregate(pipeline).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor({"after": str(docs[-1]["_id"])})
+    for doc in docs:
+        doc["_id"] = str(doc["_id"])
+        for field, default in fields.items():
+            if default is not None:
+                doc.setdefault(field, default)
+    return {"items": docs, "next_cursor": next_cursor}
@@ -0,0 +1,107 @@
+# backend/passwords.py
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException
+from backend import metrics, utils
+
+PASSWORD_POOL_KIND = os.getenv("PASSWORD_POOL_KIND", "thread")  # "thread" or "process"
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+
+
+def _timed(fn, *args):
+    """Runs inside the worker so the pool can report execution time apart from queue wait."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop in a bounded worker pool and sheds load when it backs up."""
+
+    def __init__(self, kind: str, workers: int, max_pending: int, rounds: int):
+        if kind not in ("thread", "process"):
+            raise RuntimeError(f"PASSWORD_POOL_KIND must be 'thread' or 'process', got {kind!r}")
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.pending = 0
+        self.shed = 0
+        self.rehashed = 0
+        self._executor: Optional[Executor] = None
+        self._timers = {
+            op: {"wait": metrics.OperationTimer(), "run": metrics.OperationTimer()}
+            for op in ("hash", "verify")
+        }
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def _submit(self, op: str, fn, *args):
+        if self.pending >= self.max_pending:
+            self.shed += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication service is busy. Please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        timers = self._timers[op]
+        queued_at = time.perf_counter()
+        try:
+            result, run_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, fn, *args
+            )
+        except Exception:
+            timers["run"].observe(time.perf_counter() - queued_at, error=True)
+            raise
+        finally:
+            self.pending -= 1
+        timers["wait"].observe(max(0.0, time.perf_counter() - queued_at - run_seconds))
+        timers["run"].observe(run_seconds)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", utils.hash_password, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", utils.verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return utils.password_hash_rounds(hashed_password) != self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "pool": self.kind,
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "shed": self.shed,
+            "rehashed": self.rehashed,
+            "operations": {
+                op: {phase: timer.snapshot() for phase, timer in timers.items()}
+                for op, timers in self._timers.items()
+            },
+        }
+
+
+password_hasher = PasswordHasher(
+    PASSWORD_POOL_KIND, PASSWORD_POOL_WORKERS, PASSWORD_MAX_PENDING, utils.BCRYPT_ROUNDS
+)
+metrics.register("passwords", password_hasher.stats)
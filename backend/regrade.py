@@ -0,0 +1,301 @@
+# backend/regrade.py
+# python -m backend.regrade {exam,test} <content_id> [--batch-size 500] [--concurrency 8] [--dry-run] [--restart]
+#
+# Re-scores stored exam results or test attempts against the current answer
+# key and test cases, e.g. after a seeded correct_answer or test case is fixed.
+# Documents are streamed by _id in batches; MCQs are re-scored for the whole
+# batch at once with NumPy; coding answers are re-executed only when the
+# question's test cases changed since they were graded (their stored
+# fingerprint differs). Changes go back as ordered bulk_write batches, and a
+# checkpoint after each batch lets an interrupted run resume where it stopped.
+# The dashboard statistics of users whose scores changed are rebuilt per batch,
+# and leaderboard.changed() has every API process rebuild the board, which
+# would otherwise only ever raise a user's best.
+# The run starts with content_cache.changed(), so it grades against the edited
+# content and running API processes stop grading new submissions with the old.
+
+import argparse
+import asyncio
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+from pymongo import DeleteMany, InsertOne, UpdateMany, UpdateOne
+
+from backend import content_cache, content_index, database, leaderboard, user_stats
+from backend.http_client import outbound
+from backend.routers import exams, tests
+
+checkpoints_collection = database.db["regrade_checkpoints"]
+
+NONE = "\x00"  # stands in for a missing answer/key in the string arrays
+
+
+def mcq_matrix(answer_rows: List[Dict[str, Optional[str]]], record: content_index.ContentRecord, require_answer: bool):
+    """Boolean (documents x MCQ questions) matrix of correct answers, plus the question ids."""
+    mcq_ids = list(record.answer_key)
+    if not mcq_ids or not answer_rows:
+        return np.zeros((len(answer_rows), len(mcq_ids)), dtype=bool), mcq_ids
+    answers = np.array(
+        [[NONE if row.get(q) is None else str(row.get(q)) for q in mcq_ids] for row in answer_rows], dtype=str
+    )
+    key = np.array([NONE if record.answer_key[q] is None else str(record.answer_key[q]) for q in mcq_ids], dtype=str)
+    correct = answers == key[np.newaxis, :]
+    if require_answer:
+        # Tests only credit a non-empty answer against a key that exists
+        correct &= (answers != NONE) & (answers != "") & (key != NONE)[np.newaxis, :]
+    return correct, mcq_ids
+
+
+class Regrader:
+    def __init__(self, kind: str, record: content_index.ContentRecord, concurrency: int, dry_run: bool):
+        self.kind = kind
+        self.record = record
+        self.dry_run = dry_run
+        self.limit = asyncio.Semaphore(concurrency)
+        self.users = set()  # owners of changed documents, whose dashboard statistics need a rebuild
+        self.counts = {
+            "processed": 0, "changed": 0, "reexecuted": 0, "unverifiable": 0,
+            "score_up": 0, "score_down": 0,
+            # tests: pass/fail against pass_criteria; exams: per-question correctness
+            "fail_to_pass": 0, "pass_to_fail": 0,
+            "questions_to_correct": 0, "questions_to_incorrect": 0,
+        }
+
+    async def _run(self, func, *args):
+        async with self.limit:
+            self.counts["reexecuted"] += 1
+            return await func(*args)
+
+    # --- Tests: partial credit per question, certification on pass ---
+    async def _regrade_attempts(self, docs: List[dict]):
+        record = self.record
+        correct, mcq_ids = mcq_matrix([doc.get("answers") or {} for doc in docs], record, require_answer=True)
+        mcq_credit = correct.sum(axis=1)
+
+        coding = [q for q in record.questions if q.question_type == "coding"]
+        pending = {}
+        coding_scores = [dict() for _ in docs]
+        for i, doc in enumerate(docs):
+            stored_scores = doc.get("question_scores") or {}
+            stored_prints = doc.get("case_fingerprints") or {}
+            for q in coding:
+                code = (doc.get("answers") or {}).get(q.id, "")
+                if not code.strip() or not q.all_cases:
+                    continue
+                if q.id in stored_scores and stored_prints.get(q.id) == q.cases_fingerprint:
+                    coding_scores[i][q.id] = stored_scores[q.id]
+                    continue
+                encoded = base64.b64encode(code.encode()).decode()
+                pending[(i, q.id)] = self._run(tests.run_code_against_testcases, encoded, 71, list(q.all_cases), outbound)
+        for (i, q_id), results in zip(pending, await asyncio.gather(*pending.values())):
+            passed = sum(1 for r in results if r["status"]["description"] == "Accepted")
+            coding_scores[i][q_id] = passed / len(results)
+
+        updates, cert_ops = [], []
+        for i, doc in enumerate(docs):
+            question_scores = {q: 1 for q, ok in zip(mcq_ids, correct[i]) if ok}
+            question_scores.update(coding_scores[i])
+            total = float(mcq_credit[i]) + sum(coding_scores[i].values())
+            new_score = round(total / record.question_count * 100, 2) if record.question_count else 0
+            old_score = doc.get("score", 0)
+            old_passed, new_passed = old_score >= record.pass_criteria, new_score >= record.pass_criteria
+            fingerprints = {q.id: q.cases_fingerprint for q in coding if q.id in coding_scores[i]}
+            if new_score == old_score and question_scores == doc.get("question_scores"):
+                continue
+            self._count_score(doc, old_score, new_score)
+            self.counts["fail_to_pass"] += not old_passed and new_passed
+            self.counts["pass_to_fail"] += old_passed and not new_passed
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "score": new_score, "question_scores": question_scores, "case_fingerprints": fingerprints,
+                "regraded_at": datetime.utcnow(),
+            }}))
+            attempt_id = str(doc["_id"])
+            if new_passed and not old_passed:
+                cert_ops.append(InsertOne({
+                    "user_id": doc["user_id"], "test_id": record.id, "test_name": record.title,
+                    "score": new_score, "awarded_at": datetime.utcnow(), "attempt_id": attempt_id,
+                }))
+            elif old_passed and not new_passed:
+                cert_ops.append(DeleteMany({"attempt_id": attempt_id}))
+            elif new_passed:
+                cert_ops.append(UpdateMany({"attempt_id": attempt_id}, {"$set": {"score": new_score}}))
+        await self._write(database.attempts_collection, updates)
+        await self._write(database.certifications_collection, cert_ops)
+
+    # --- Exams: all-or-nothing per question, details per question ---
+    async def _regrade_results(self, docs: List[dict]):
+        record = self.record
+        answer_rows = []
+        for doc in docs:
+            details = doc.get("details") or {}
+            answers = dict(doc.get("answers") or {})
+            for q_id, detail in details.items():
+                if detail.get("type") == "mcq":
+                    answers.setdefault(q_id, detail.get("user_answer"))
+            answer_rows.append(answers)
+        correct, mcq_ids = mcq_matrix(answer_rows, record, require_answer=False)
+
+        new_details = [dict(doc.get("details") or {}) for doc in docs]
+        pending = {}
+        for i, doc in enumerate(docs):
+            for j, q_id in enumerate(mcq_ids):
+                new_details[i][q_id] = {
+                    "type": "mcq", "is_correct": bool(correct[i, j]),
+                    "user_answer": answer_rows[i].get(q_id), "correct_answer": record.answer_key[q_id],
+                }
+            for q in record.questions:
+                if q.question_type != "coding":
+                    continue
+                stored = new_details[i].get(q.id)
+                if stored is None:
+                    continue  # unanswered
+                if stored.get("cases_fingerprint") == q.cases_fingerprint and "error" not in stored:
+                    continue  # graded against the current cases
+                code = answer_rows[i].get(q.id)
+                if not code:
+                    self.counts["unverifiable"] += 1  # graded before answers were stored with results
+                    continue
+                encoded = base64.b64encode(code.encode("utf-8")).decode("utf-8")
+                pending[(i, q.id)] = self._run(exams.execute_cases, encoded, 71, list(q.hidden_cases), outbound)
+        for (i, q_id), results in zip(pending, await asyncio.gather(*pending.values())):
+            passed = sum(1 for r in results if r["status"]["description"] == "Accepted")
+            new_details[i][q_id] = {
+                "type": "coding", "passed_cases": passed, "total_cases": len(results),
+                "is_correct": passed == len(results), "grading_policy": "all",
+                "executed_cases": len(results), "stopped_early": False,
+                "cases_fingerprint": record.question(q_id).cases_fingerprint,
+            }
+
+        updates = []
+        for i, doc in enumerate(docs):
+            details = {q.id: new_details[i][q.id] for q in record.questions if q.id in new_details[i]}
+            score = sum(1 for d in details.values() if d.get("is_correct"))
+            new_score = round(score / record.question_count * 100, 2) if record.question_count else 0
+            old_details = doc.get("details") or {}
+            if new_score == doc.get("score") and details == old_details:
+                continue
+            self._count_score(doc, doc.get("score", 0), new_score)
+            for q_id, detail in details.items():
+                was, now = bool((old_details.get(q_id) or {}).get("is_correct")), bool(detail.get("is_correct"))
+                self.counts["questions_to_correct"] += now and not was
+                self.counts["questions_to_incorrect"] += was and not now
+            updates.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "score": new_score, "details": details, "regraded_at": datetime.utcnow(),
+            }}))
+        await self._write(database.results_collection, updates)
+
+    def _count_score(self, doc: dict, old: float, new: float):
+        self.counts["changed"] += 1
+        self.users.add(doc["user_id"])
+        if new > old:
+            self.counts["score_up"] += 1
+        elif new < old:
+            self.counts["score_down"] += 1
+
+    async def _write(self, collection, operations: list):
+        if operations and not self.dry_run:
+            await collection.bulk_write(operations, ordered=True)
+
+    async def regrade(self, docs: List[dict]):
+        if self.kind == "test":
+            await self._regrade_attempts(docs)
+        else:
+            await self._regrade_results(docs)
+        self.counts["processed"] += len(docs)
+
+
+async def run(kind: str, content_id: str, batch_size: int, concurrency: int, dry_run: bool, restart: bool):
+    index, collection, field = {
+        "exam": (content_index.exams, database.results_collection, "exam_id"),
+        "test": (content_index.tests, database.attempts_collection, "test_id"),
+    }[kind]
+    if not dry_run:
+        await content_cache.changed(index.cache.name)
+    record = await index.get(content_id)
+    if record is None:
+        raise SystemExit(f"{kind} {content_id} not found")
+
+    checkpoint_id = f"{kind}:{content_id}:{record.key_version}"  # each answer key fix gets its own checkpoint
+    checkpoint = None if restart else await checkpoints_collection.find_one({"_id": checkpoint_id})
+    if checkpoint and checkpoint.get("finished") and not dry_run:
+        print(f"Already re-graded against this answer key ({checkpoint_id}); pass --restart to run again.")
+        return
+    query = {field: content_id}
+    if checkpoint and checkpoint.get("last_id") is not None:
+        query["_id"] = {"$gt": checkpoint["last_id"]}
+        print(f"Resuming {checkpoint_id} after {checkpoint['last_id']}")
+
+    regrader = Regrader(kind, record, concurrency, dry_run)
+    if checkpoint:
+        regrader.counts.update(checkpoint.get("counts", {}))
+    start = time.perf_counter()
+    processed_here = 0
+
+    async def flush(batch: List[dict]):
+        nonlocal processed_here
+        await regrader.regrade(batch)
+        processed_here += len(batch)
+        if not dry_run:
+            if regrader.users:
+                await user_stats.rebuild(sorted(regrader.users))
+                # In-memory leaderboards hold each user's old best until rebuilt
+                await leaderboard.changed(kind, content_id)
+                regrader.users.clear()
+            await checkpoints_collection.update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"last_id": batch[-1]["_id"], "counts": regrader.counts, "updated_at": datetime.utcnow()},
+                 "$setOnInsert": {"started_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        elapsed = time.perf_counter() - start
+        print(f"{regrader.counts['processed']} processed, {regrader.counts['changed']} changed, "
+              f"{processed_here / elapsed:.0f} docs/s")
+
+    outbound.open()
+    try:
+        batch = []
+        cursor = collection.find(query).sort("_id", 1).batch_size(batch_size)
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+    finally:
+        await outbound.close()
+
+    elapsed = time.perf_counter() - start
+    if not dry_run:
+        await checkpoints_collection.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"finished": True, "counts": regrader.counts, "updated_at": datetime.utcnow()}},
+            upsert=True,
+        )
+    print(json.dumps({
+        "checkpoint": checkpoint_id,
+        "dry_run": dry_run,
+        "seconds": round(elapsed, 2),
+        "docs_per_second": round(processed_here / elapsed, 1) if elapsed else None,
+        **regrader.counts,
+    }, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score stored results/attempts against the current answer key.")
+    parser.add_argument("kind", choices=["exam", "test"])
+    parser.add_argument("content_id")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8, help="coding re-executions in flight")
+    parser.add_argument("--dry-run", action="store_true", help="report the diff without writing anything")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+    asyncio.run(run(args.kind, args.content_id, args.batch_size, args.concurrency, args.dry_run, args.restart))
+
+
+if __name__ == "__main__":
+    main()
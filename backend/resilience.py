@@ -0,0 +1,209 @@
+# backend/resilience.py
+# Fault isolation for code-execution upstreams. Each upstream gets its own
+# bulkhead (a concurrency cap with a bounded wait queue, so a slow Judge0
+# can only tie up its own slots) and circuit breaker (fail fast once the
+# upstream keeps failing, then let a few probes through to test recovery).
+# Callers turned away by either get UpstreamUnavailable: a 503 with
+# Retry-After that the grading queue treats as "defer", not "fail".
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Dict, TypeVar
+
+import httpx
+from fastapi import HTTPException
+from backend import metrics
+
+EXECUTION_BULKHEAD_SIZE = int(os.getenv("EXECUTION_BULKHEAD_SIZE", "32"))
+EXECUTION_BULKHEAD_QUEUE = int(os.getenv("EXECUTION_BULKHEAD_QUEUE", "64"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # consecutive failures
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "2"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+T = TypeVar("T")
+
+
+class UpstreamUnavailable(HTTPException):
+    """Raised without calling the upstream: its breaker is open or its bulkhead is full."""
+
+    def __init__(self, upstream: str, reason: str, retry_after: float):
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(
+            status_code=503,
+            detail=f"Code execution is temporarily unavailable ({reason}). Please retry shortly.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+
+class ConfigurationError(HTTPException):
+    """A local setup problem, such as a missing API key: reported as is, never held against the upstream."""
+
+    def __init__(self, detail: str):
+        super().__init__(status_code=500, detail=detail)
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Errors that say the upstream is unhealthy: transport errors and 5xx answers.
+
+    Client errors (4xx) and local configuration errors don't count.
+    """
+    if isinstance(error, (UpstreamUnavailable, ConfigurationError)):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500  # judge0.py wraps transport errors and upstream answers this way
+    return isinstance(error, (httpx.RequestError, asyncio.TimeoutError, OSError))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, open_seconds: float, half_open_probes: int):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self.failures = 0  # consecutive
+        self.opened_at = 0.0
+        self.probes = 0  # in flight while half open
+        self.rejected = 0
+        self.transitions = {CLOSED: 0, OPEN: 0, HALF_OPEN: 0}
+        self._timers = {state: metrics.OperationTimer() for state in (CLOSED, HALF_OPEN)}
+
+    def _move(self, state: str):
+        if state != self.state:
+            self.state = state
+            self.transitions[state] += 1
+            if state == OPEN:
+                self.opened_at = time.monotonic()
+                self.probes = 0
+
+    def check(self):
+        """Raises while the breaker is open and its cool-down hasn't elapsed."""
+        if self.state == OPEN:
+            remaining = self.opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise UpstreamUnavailable(self.name, "circuit open", remaining)
+
+    def before_call(self) -> str:
+        """Admits a call or raises; returns the state it was admitted in."""
+        self.check()
+        if self.state == OPEN:
+            self._move(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self.probes >= self.half_open_probes:
+                self.rejected += 1
+                raise UpstreamUnavailable(self.name, "circuit half open", 1)
+            self.probes += 1
+        return self.state
+
+    def after_call(self, admitted_in: str, seconds: float, error: BaseException = None):
+        if admitted_in == HALF_OPEN:
+            self.probes -= 1
+        if isinstance(error, asyncio.CancelledError):
+            return  # the caller left; says nothing about the upstream
+        failed = error is not None and is_upstream_failure(error)
+        self._timers[admitted_in].observe(seconds, error=failed)
+        if failed:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._move(OPEN)
+        else:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self._move(CLOSED)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+            "calls": {state: timer.snapshot() for state, timer in self._timers.items()},
+        }
+
+
+class Bulkhead:
+    def __init__(self, name: str, size: int, max_queue: int):
+        self.name = name
+        self.size = size
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self.shed = 0
+        self._slots = asyncio.Semaphore(size)
+        self._wait_timer = metrics.OperationTimer()
+
+    async def acquire(self):
+        if self.active >= self.size and self.waiting >= self.max_queue:
+            self.shed += 1
+            raise UpstreamUnavailable(self.name, "too many queued runs", 2)
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self._wait_timer.observe(time.perf_counter() - start)
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "shed": self.shed,
+            "wait": self._wait_timer.snapshot(),
+        }
+
+
+class UpstreamGuard:
+    """Bulkhead plus breaker for one upstream."""
+
+    def __init__(self, name: str):
+        self.bulkhead = Bulkhead(name, EXECUTION_BULKHEAD_SIZE, EXECUTION_BULKHEAD_QUEUE)
+        self.breaker = CircuitBreaker(name, BREAKER_FAILURE_THRESHOLD, BREAKER_OPEN_SECONDS, BREAKER_HALF_OPEN_PROBES)
+
+    async def call(self, func: Callable[[], Awaitable[T]]) -> T:
+        self.breaker.check()  # fail fast before taking a queue position
+        await self.bulkhead.acquire()
+        try:
+            admitted_in = self.breaker.before_call()  # the breaker may have opened while we queued
+        except UpstreamUnavailable:
+            self.bulkhead.release()
+            raise
+        start = time.monotonic()
+        try:
+            result = await func()
+        except BaseException as e:
+            self.breaker.after_call(admitted_in, time.monotonic() - start, e)
+            raise
+        finally:
+            self.bulkhead.release()
+        self.breaker.after_call(admitted_in, time.monotonic() - start)
+        return result
+
+    def stats(self) -> dict:
+        return {"breaker": self.breaker.stats(), "bulkhead": self.bulkhead.stats()}
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def guard(upstream: str) -> UpstreamGuard:
+    if upstream not in _guards:
+        _guards[upstream] = UpstreamGuard(upstream)
+    return _guards[upstream]
+
+
+metrics.register("execution_resilience", lambda: {name: g.stats() for name, g in _guards.items()})
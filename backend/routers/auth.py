@@ -1,5 +1,7 @@
-from fastapi import APIRouter, HTTPException, Response, Depends
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
+from pymongo.errors import DuplicateKeyError
 from backend import models, utils, database
+from backend.passwords import password_hasher
 
 router = APIRouter(prefix="/api", tags=["Authentication"])
 
@@ -12,24 +14,37 @@ async def signup(user: models.SignupModel):
     if not utils.validate_password(user.password):
         raise HTTPException(status_code=400, detail="Password does not meet complexity requirements.")
 
-    if await users_collection.find_one({"username": user.username}):
-        raise HTTPException(status_code=400, detail="Username already taken.")
-    if await users_collection.find_one({"email": user.email}):
-        raise HTTPException(status_code=400, detail="Email already registered.")
-
-    hashed_pw = utils.hash_password(user.password)
+    hashed_pw = await password_hasher.hash(user.password)
     user_doc = user.dict()
     user_doc["password"] = hashed_pw
-    await users_collection.insert_one(user_doc)
+    # Uniqueness is enforced by the username/email indexes (see backend/indexes.py)
+    try:
+        await users_collection.insert_one(user_doc)
+    except DuplicateKeyError as e:
+        key_pattern = (e.details or {}).get("keyPattern") or {}
+        if "email" in key_pattern or "email_unique" in str(e):
+            raise HTTPException(status_code=400, detail="Email already registered.")
+        raise HTTPException(status_code=400, detail="Username already taken.")
     return {"success": True, "message": "Registration successful! Please login."}
 
 @router.post("/login")
 async def login(login_data: models.LoginModel, response: Response):
     users_collection = database.db["users"]
     user = await users_collection.find_one({"username": login_data.username})
-    if not user or not utils.verify_password(login_data.password, user["password"]):
+    if not user or not await password_hasher.verify(login_data.password, user["password"]):
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
+    # Upgrade hashes created under an older BCRYPT_ROUNDS while we have the plaintext
+    if password_hasher.needs_rehash(user["password"]):
+        try:
+            new_hash = await password_hasher.hash(login_data.password)
+        except HTTPException:
+            pass  # pool is saturated; try again on the next login
+        else:
+            await users_collection.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+            utils.invalidate_principal(user["_id"])
+            password_hasher.rehashed += 1
+
     token = utils.create_access_token({"sub": str(user["_id"])})
     response.set_cookie(key="token", value=token, httponly=True, samesite="Lax", secure=False)
     return {
@@ -38,7 +53,11 @@ async def login(login_data: models.LoginModel, response: Response):
     }
 
 @router.post("/logout")
-async def logout(response: Response):
+async def logout(request: Request, response: Response):
+    token = request.cookies.get("token")
+    user_id = utils.get_token_subject(token) if token else None
+    if user_id:
+        utils.invalidate_principal(user_id)
     response.delete_cookie("token")
     return {"success": True, "message": "Logged out"}
 
@@ -0,0 +1,116 @@
+# backend/routers/dashboard.py
+# One activity feed across exam results, test attempts and interview results.
+# Each source is read newest first off its (user_id, submitted_at) index and
+# the three streams are k-way merged, so a page reads at most limit + 1
+# summary-sized documents per source. The cursor records how far each source
+# has been consumed, and sources that ran out are not queried again.
+# Aggregate statistics come precomputed from backend/user_stats.py.
+import heapq
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from backend import database, models, pagination, user_stats, utils
+
+router = APIRouter(prefix="/api/user", tags=["Dashboard"])
+
+HISTORY_PAGE_SIZE = 20
+
+# type -> (collection, content id field, title field, score field, factor to a percentage)
+SOURCES = {
+    "exam": (database.results_collection, "exam_id", "exam_title", "score", 1),
+    "test": (database.attempts_collection, "test_id", "test_name", "score", 1),
+    "interview": (database.interview_results_collection, "interview_id", "interview_title", "final_score", 20),  # scored 1-5
+}
+
+
+class _Newest:
+    """Heap key ordering documents by (submitted_at, _id) descending."""
+    __slots__ = ("key",)
+
+    def __init__(self, doc: dict):
+        self.key = (doc["submitted_at"], doc["_id"])
+
+    def __lt__(self, other: "_Newest") -> bool:
+        return self.key > other.key
+
+
+def _item(source: str, doc: dict) -> dict:
+    _, content_field, title_field, score_field, scale = SOURCES[source]
+    raw_score = doc.get(score_field)
+    return {
+        "id": str(doc["_id"]),
+        "type": source,
+        "content_id": doc.get(content_field),
+        "title": doc.get(title_field),
+        "score": round(raw_score * scale, 2) if isinstance(raw_score, (int, float)) else None,
+        "raw_score": raw_score,
+        "submitted_at": doc["submitted_at"],
+    }
+
+
+@router.get("/history", response_model=models.HistoryPage)
+async def get_user_history(
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    """Exams, tests and interviews, newest first, in one cursor-paginated list."""
+    user_id = str(current_user["_id"])
+    positions = pagination.decode_cursor(cursor)
+
+    streams = {}
+    for source, (collection, content_field, title_field, score_field, _) in SOURCES.items():
+        position = positions.get(source) or {}
+        if not isinstance(position, dict):
+            position = {}
+        if position.get("done"):
+            continue
+        query = {
+            "user_id": user_id,
+            "submitted_at": {"$type": "date"},  # legacy documents without a timestamp can't be ordered
+            **pagination.before_filter(position, "submitted_at"),
+        }
+        fields = {content_field: 1, title_field: 1, score_field: 1, "submitted_at": 1}
+        streams[source] = collection.find(query, fields) \
+            .sort([("submitted_at", -1), ("_id", -1)]).limit(limit + 1).batch_size(limit + 1)
+
+    heap = []
+
+    async def pull(source: str):
+        try:
+            doc = await streams[source].next()
+        except StopAsyncIteration:
+            return
+        heapq.heappush(heap, (_Newest(doc), source, doc))
+
+    for source in streams:
+        await pull(source)
+
+    items, last = [], {}
+    while heap and len(items) < limit:
+        _, source, doc = heapq.heappop(heap)
+        items.append(_item(source, doc))
+        last[source] = doc
+        await pull(source)
+
+    next_cursor = None
+    if heap:
+        # Every source with documents left has one in the heap: the page
+        # consumed at most limit of the limit + 1 it fetched
+        pending = {source for _, source, _ in heap}
+        next_position = {}
+        for source in SOURCES:
+            if source not in pending:
+                next_position[source] = {"done": True}
+            elif source in last:
+                next_position[source] = {"at": last[source]["submitted_at"].isoformat(), "id": str(last[source]["_id"])}
+            else:
+                next_position[source] = positions.get(source) or {}
+        next_cursor = pagination.encode_cursor(next_position)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/stats", response_model=dict)
+async def get_user_stats(current_user: dict = Depends(utils.get_current_user)):
+    """Counts, mean/variance, best scores, per-tag figures and recent scores, from one document."""
+    return await user_stats.get(str(current_user["_id"]))
@@ -1,17 +1,24 @@
 # backend/routers/exams.py
-import httpx
-import os
 import asyncio
 import base64
-from fastapi import APIRouter, Depends, HTTPException
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 from bson import ObjectId
 from datetime import datetime
-from backend import models, utils, database
+from backend import models, utils, database, content_cache, content_index, execution, grading, pagination, resilience, user_stats
+from backend.http_client import OutboundClient, get_outbound_client, outbound
+from backend.case_stats import EXAM_GRADING_POLICY, case_stats
+from backend.leaderboard import leaderboards
 
 router = APIRouter(prefix="/api", tags=["Exams"])
 
+# Coding questions graded at once for a single exam submission
+EXAM_QUESTION_CONCURRENCY = int(os.getenv("EXAM_QUESTION_CONCURRENCY", "4"))
+
+EXAM_SUMMARY_FIELDS = {"title": None, "description": None, "difficulty": None, "tags": None, "duration_minutes": None}
+
 # --- Pydantic Models ---
 class CodeExecutionRequest(BaseModel):
     source_code: str  # base64 encoded string
@@ -23,27 +30,179 @@ class SubmissionRequest(BaseModel):
     answers: Dict[str, str]
 
 # --- Helper Functions ---
-async def get_exam_from_db(exam_id: str):
+async def get_exam_record(exam_id: str) -> content_index.ContentRecord:
     if not ObjectId.is_valid(exam_id):
         raise HTTPException(status_code=400, detail="Invalid Exam ID format.")
-    exam = await database.exams_collection.find_one({"_id": ObjectId(exam_id)})
+    exam = await content_index.exams.get(exam_id)
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found.")
     return exam
 
+async def execute_cases(source_code: str, language_id: int, test_cases: List[dict], client: OutboundClient) -> List[dict]:
+    # No expected output is sent: a case counts as Accepted when it runs cleanly
+    return await execution.run_cases("rapidapi", source_code, language_id, test_cases, client, compare_output=False)
+
+async def grade_exam(
+    exam: content_index.ContentRecord,
+    session: dict,
+    answers: Dict[str, str],
+    client: OutboundClient,
+    job: Optional[dict] = None
+) -> dict:
+    """Scores an exam session, stores the result and closes the session.
+
+    MCQs are scored first; the coding questions then run concurrently (at most
+    EXAM_QUESTION_CONCURRENCY at a time). detailed_results keeps the exam's question order.
+    Under EXAM_GRADING_POLICY=fail_fast a question stops at its first failing case.
+    """
+    question_limit = asyncio.Semaphore(EXAM_QUESTION_CONCURRENCY)
+
+    async def grade_coding(question: content_index.QuestionRecord, user_answer: str, hidden_cases: list) -> dict:
+        q_id = question.id
+        encoded_code = base64.b64encode(user_answer.encode('utf-8')).decode('utf-8')
+
+        async def run(cases: list) -> list:
+            async with question_limit:
+                return await execute_cases(encoded_code, 71, cases, client)  # 71 = Python
+
+        try:
+            if EXAM_GRADING_POLICY == "fail_fast":
+                ordered = await case_stats.order(exam.id, q_id, hidden_cases)
+                outcomes, stopped_early = await case_stats.run_fail_fast(ordered, run)
+            else:
+                outcomes, stopped_early = list(zip(hidden_cases, await run(hidden_cases))), False
+        except resilience.UpstreamUnavailable:
+            raise  # nothing was run: retry (or, for queued jobs, defer) the whole submission
+        except HTTPException as e:
+            return {"type": "coding", "error": f"Grading failed: {e.detail}", "is_correct": False}
+        except Exception as e:
+            # One question's failure shouldn't cost the others their grades
+            return {"type": "coding", "error": f"Grading failed: {type(e).__name__}", "is_correct": False}
+
+        await case_stats.record(exam.id, q_id, outcomes)
+        passed_count = sum(1 for _, res in outcomes if res["status"]["description"] == "Accepted")
+        return {
+            "type": "coding",
+            "passed_cases": passed_count,
+            "total_cases": len(hidden_cases),
+            "is_correct": passed_count == len(hidden_cases),
+            "grading_policy": EXAM_GRADING_POLICY,
+            "executed_cases": len(outcomes),
+            "stopped_early": stopped_early,
+            "cases_fingerprint": question.cases_fingerprint
+        }
+
+    total_questions = exam.question_count
+    detailed_results = {}
+    coding_jobs = {}
+
+    for question in exam.questions:
+        q_id = question.id
+        user_answer = answers.get(q_id)
+
+        if question.question_type == "mcq":
+            is_correct = user_answer == question.correct_answer
+            detailed_results[q_id] = {
+                "type": "mcq",
+                "is_correct": is_correct,
+                "user_answer": user_answer,
+                "correct_answer": question.correct_answer
+            }
+
+        elif question.question_type == "coding" and user_answer:
+            hidden_cases = list(question.hidden_cases)
+            if not hidden_cases:
+                detailed_results[q_id] = {"type": "coding", "error": "No hidden test cases for grading.", "user_code": user_answer}
+                continue
+            detailed_results[q_id] = None  # placeholder keeps the question order
+            coding_jobs[q_id] = grade_coding(question, user_answer, hidden_cases)
+
+    # grade_coding only raises UpstreamUnavailable, so gather returns every question's outcome
+    for q_id, detail in zip(coding_jobs, await asyncio.gather(*coding_jobs.values())):
+        detailed_results[q_id] = detail
+
+    score = sum(1 for detail in detailed_results.values() if detail.get("is_correct"))
+
+    final_score_percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+
+    result_doc = {
+        "user_id": session["user_id"],
+        "session_id": str(session["_id"]),
+        "exam_id": session["exam_id"],
+        "exam_title": exam.title,
+        "submitted_at": job["created_at"] if job else datetime.utcnow(),
+        "score": round(final_score_percentage, 2),
+        "details": detailed_results,
+        "answers": answers  # lets a re-grade re-run coding answers
+    }
+
+    result_id = await grading.insert_once(database.results_collection, result_doc, job)
+    await user_stats.record(
+        result_doc["user_id"], "exam", str(result_id), result_doc["score"], exam.tags, result_doc["submitted_at"]
+    )
+    leaderboards.record("exam", exam.id, result_doc["user_id"], result_doc["score"])
+    if job is None:  # queued submits closed the session when they were accepted
+        await database.sessions_collection.update_one(
+            {"_id": session["_id"]},
+            {"$set": {"end_time": datetime.utcnow()}}
+        )
+
+    return {"success": True, "message": "Exam submitted and graded successfully.", "score": result_doc["score"]}
+
+@grading.handler("exam")
+async def grade_exam_job(job: dict) -> dict:
+    session = await database.sessions_collection.find_one({
+        "_id": ObjectId(job["payload"]["session_id"]),
+        "user_id": job["user_id"]
+    })
+    if not session:
+        raise HTTPException(status_code=404, detail="Exam session not found.")
+    exam = await get_exam_record(session["exam_id"])
+    return await grade_exam(exam, session, job["payload"]["answers"], outbound, job)
+
+
+async def _reopen_session(session_id: ObjectId, job_id: str):
+    await database.sessions_collection.update_one(
+        {"_id": session_id, "grading_job_id": job_id},
+        {"$set": {"end_time": None}, "$unset": {"grading_job_id": ""}}
+    )
+
+
+@grading.on_failure("exam")
+async def reopen_exam_session(job: dict):
+    """A job that failed for good leaves no result, so the user gets to submit again."""
+    if await database.results_collection.find_one({"grading_job_id": job["_id"]}, {"_id": 1}):
+        return
+    await _reopen_session(ObjectId(job["payload"]["session_id"]), job["_id"])
+
+
 # --- API Routes ---
 
 @router.get("/exams", response_model=List[models.ExamModel])
-async def get_all_exams(current_user: dict = Depends(utils.get_current_user)):
-    return await database.exams_collection.find().to_list(length=100)
+async def get_all_exams(request: Request, current_user: dict = Depends(utils.get_current_user)):
+    cached = await content_cache.exams.listing()
+    return content_cache.respond(request, cached)
+
+@router.get("/exams/summary", response_model=models.ContentSummaryPage)
+async def get_exam_summaries(
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    return await pagination.summary_page(database.exams_collection, EXAM_SUMMARY_FIELDS, limit, cursor)
 
 @router.get("/exams/{exam_id}", response_model=models.ExamModel)
-async def get_exam_details(exam_id: str, current_user: dict = Depends(utils.get_current_user)):
-    return await get_exam_from_db(exam_id)
+async def get_exam_details(exam_id: str, request: Request, current_user: dict = Depends(utils.get_current_user)):
+    if not ObjectId.is_valid(exam_id):
+        raise HTTPException(status_code=400, detail="Invalid Exam ID format.")
+    cached = await content_cache.exams.item(exam_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Exam not found.")
+    return content_cache.respond(request, cached)
 
 @router.post("/exams/start/{exam_id}", response_model=dict)
 async def start_exam_session(exam_id: str, current_user: dict = Depends(utils.get_current_user)):
-    await get_exam_from_db(exam_id)
+    await get_exam_record(exam_id)
     
     # Create session with explicit fields
     session_data = {
@@ -61,47 +220,22 @@ async def start_exam_session(exam_id: str, current_user: dict = Depends(utils.ge
     return {"session_id": session_id}
 
 @router.post("/exams/run-code", response_model=dict)
-async def run_code(request: CodeExecutionRequest, current_user: dict = Depends(utils.get_current_user)):
-    JUDGE0_API_KEY = os.getenv("VITE_JUDGE0_API_KEY")
-    if not JUDGE0_API_KEY:
-        raise HTTPException(status_code=500, detail="Judge0 API key not configured on the server.")
-
-    submissions = [
-        {
-            "source_code": request.source_code,
-            "language_id": request.language_id,
-            "stdin": base64.b64encode(case.get("input", "").encode('utf-8')).decode('utf-8')
-        } for case in request.test_cases
-    ]
-    headers = {"X-RapidAPI-Key": JUDGE0_API_KEY, "X-RapidAPI-Host": "judge0-ce.p.rapidapi.com"}
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                "https://judge0-ce.p.rapidapi.com/submissions/batch?base64_encoded=true",
-                json={"submissions": submissions},
-                headers=headers,
-                timeout=20
-            )
-            response.raise_for_status()
-            tokens = [sub['token'] for sub in response.json()]
-            await asyncio.sleep(3)
-
-            result_response = await client.get(
-                f"https://judge0-ce.p.rapidapi.com/submissions/batch?tokens={','.join(tokens)}&base64_encoded=true&fields=stdout,stderr,status",
-                headers=headers,
-                timeout=20
-            )
-            result_response.raise_for_status()
-            return {"results": result_response.json()["submissions"]}
-
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=503, detail=f"Could not connect to code execution service: {e}")
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(status_code=e.response.status_code, detail=f"Error from code execution service: {e.response.text}")
+async def run_code(
+    request: CodeExecutionRequest,
+    current_user: dict = Depends(utils.get_current_user),
+    client: OutboundClient = Depends(get_outbound_client)
+):
+    results = await execute_cases(request.source_code, request.language_id, request.test_cases, client)
+    return {"results": results}
 
 @router.post("/exams/submit", response_model=dict)
-async def submit_exam_and_grade(submission: SubmissionRequest, current_user: dict = Depends(utils.get_current_user)):
+async def submit_exam_and_grade(
+    submission: SubmissionRequest,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(utils.get_current_user),
+    client: OutboundClient = Depends(get_outbound_client)
+):
     # Validate ObjectId
     try:
         session_obj_id = ObjectId(submission.session_id)
@@ -119,72 +253,29 @@ async def submit_exam_and_grade(submission: SubmissionRequest, current_user: dic
     if session.get("end_time"):
         raise HTTPException(status_code=400, detail="Exam already submitted.")
 
-    exam = await get_exam_from_db(session["exam_id"])
-    score = 0
-    total_questions = len(exam["questions"])
-    detailed_results = {}
-
-    for question in exam["questions"]:
-        q_id = question["id"]
-        user_answer = submission.answers.get(q_id)
-        is_correct = False
-
-        if question["question_type"] == "mcq":
-            is_correct = user_answer == question.get("correct_answer")
-            if is_correct: score += 1
-            detailed_results[q_id] = {
-                "type": "mcq",
-                "is_correct": is_correct,
-                "user_answer": user_answer,
-                "correct_answer": question.get("correct_answer")
-            }
-
-        elif question["question_type"] == "coding" and user_answer:
-            hidden_cases = [tc for tc in question.get("test_cases", []) if tc.get("hidden")]
-            if not hidden_cases:
-                detailed_results[q_id] = {"type": "coding", "error": "No hidden test cases for grading.", "user_code": user_answer}
-                continue
-
-            try:
-                encoded_code = base64.b64encode(user_answer.encode('utf-8')).decode('utf-8')
-                run_result = await run_code(CodeExecutionRequest(
-                    source_code=encoded_code,
-                    language_id=71,  # Python
-                    test_cases=hidden_cases
-                ), current_user)
-
-                passed_count = sum(1 for res in run_result["results"] if res["status"]["description"] == "Accepted")
-                is_correct = passed_count == len(hidden_cases)
-                if is_correct: score += 1
-                detailed_results[q_id] = {
-                    "type": "coding",
-                    "passed_cases": passed_count,
-                    "total_cases": len(hidden_cases),
-                    "is_correct": is_correct
-                }
-
-            except HTTPException as e:
-                detailed_results[q_id] = {"type": "coding", "error": f"Grading failed: {e.detail}", "is_correct": False}
-
-    final_score_percentage = (score / total_questions) * 100 if total_questions > 0 else 0
-
-    result_doc = {
-        "user_id": str(current_user["_id"]),
-        "session_id": submission.session_id,
-        "exam_id": session["exam_id"],
-        "exam_title": exam["title"],
-        "submitted_at": datetime.utcnow(),
-        "score": round(final_score_percentage, 2),
-        "details": detailed_results
-    }
-
-    await database.db["results"].insert_one(result_doc)
-    await database.sessions_collection.update_one(
-        {"_id": session_obj_id}, 
-        {"$set": {"end_time": datetime.utcnow()}}
-    )
+    exam = await get_exam_record(session["exam_id"])
+    if grading.wants_queue(request):
+        # Close the session now so a second submit is rejected while the job waits. The job id
+        # goes on the session in the same step, so a failed job can reopen it (see reopen_exam_session)
+        job_id = grading.new_job_id()
+        closed = await database.sessions_collection.update_one(
+            {"_id": session_obj_id, "end_time": None},
+            {"$set": {"end_time": datetime.utcnow(), "grading_job_id": job_id}}
+        )
+        if not closed.modified_count:
+            raise HTTPException(status_code=400, detail="Exam already submitted.")
+        try:
+            job = await grading.grading_queue.enqueue(
+                "exam", str(current_user["_id"]), {"session_id": submission.session_id, "answers": submission.answers},
+                job_id=job_id,
+            )
+        except Exception:
+            await _reopen_session(session_obj_id, job_id)
+            raise
+        response.status_code = 202
+        return {"success": True, "job_id": job["_id"], "status": job["status"], "status_url": f"/api/grading/jobs/{job['_id']}"}
+    return await grade_exam(exam, session, submission.answers, client)
 
-    return {"success": True, "message": "Exam submitted and graded successfully.", "score": result_doc["score"]}
 
 @router.get("/user/results", response_model=List[dict])
 async def get_user_exam_results(current_user: dict = Depends(utils.get_current_user)):
@@ -0,0 +1,36 @@
+# backend/routers/export.py
+import os
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from backend import export, utils
+
+router = APIRouter(prefix="/api/export", tags=["Export"])
+
+# Exports span every user's results, so only these accounts may run them; empty disables the endpoint
+EXPORT_ALLOWED_EMAILS = {email.strip().lower() for email in os.getenv("EXPORT_ALLOWED_EMAILS", "").split(",") if email.strip()}
+
+async def require_exporter(current_user: dict = Depends(utils.get_current_user)) -> dict:
+    if current_user.get("email", "").lower() not in EXPORT_ALLOWED_EMAILS:
+        raise HTTPException(status_code=403, detail="Not allowed to export results")
+    return current_user
+
+@router.get("/results")
+async def export_results(
+    kind: Optional[Literal["exam", "test", "interview"]] = None,
+    content_id: Optional[str] = None,
+    tag: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    gzip: bool = False,
+    batch_size: int = Query(export.EXPORT_BATCH_SIZE, ge=1, le=10000),
+    current_user: dict = Depends(require_exporter)
+):
+    """Streams matching results as a download; all three kinds unless `kind` is given."""
+    kinds = [kind] if kind else list(export.SOURCES)
+    batches = export.row_batches(kinds, content_id, tag, export.parse_date(since), export.parse_date(until), batch_size)
+    chunks = export.stream(format, batches, gzip)  # validates the format before the response starts
+    media_type = "application/gzip" if gzip else export.FORMATS[format][0]
+    headers = {"Content-Disposition": f'attachment; filename="{export.filename(format, kinds, gzip)}"'}
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
@@ -0,0 +1,58 @@
+# backend/routers/grading.py
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from backend import utils, grading
+
+router = APIRouter(prefix="/api/grading", tags=["Grading"])
+
+SSE_POLL_SECONDS = 2  # re-reads the job even without a local notification (jobs graded by another process)
+SSE_KEEPALIVE_SECONDS = 15
+
+async def _get_owned_job(job_id: str, current_user: dict) -> dict:
+    job = await grading.grading_queue.get(job_id, str(current_user["_id"]))
+    if not job:
+        raise HTTPException(status_code=404, detail="Grading job not found")
+    return job
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_grading_job(job_id: str, current_user: dict = Depends(utils.get_current_user)):
+    return grading.job_view(await _get_owned_job(job_id, current_user))
+
+@router.get("/jobs/{job_id}/events")
+async def stream_grading_job(job_id: str, current_user: dict = Depends(utils.get_current_user)):
+    """Server-sent events: one `status` event per change, ending with the finished job."""
+    job = await _get_owned_job(job_id, current_user)
+    user_id = str(current_user["_id"])
+
+    async def events():
+        changed = grading.grading_queue.subscribe(job_id)
+        try:
+            current, last_sent, idle = job, None, 0.0
+            while True:
+                view = grading.job_view(current)
+                key = (view["status"], view["attempts"])
+                if key != last_sent:
+                    last_sent = key
+                    idle = 0.0
+                    yield f"event: status\ndata: {json.dumps(view)}\n\n"
+                if view["status"] in grading.FINISHED:
+                    return
+                changed.clear()
+                try:
+                    await asyncio.wait_for(changed.wait(), SSE_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    idle += SSE_POLL_SECONDS
+                    if idle >= SSE_KEEPALIVE_SECONDS:
+                        idle = 0.0
+                        yield ": keep-alive\n\n"
+                current = await grading.grading_queue.get(job_id, user_id) or current
+        finally:
+            grading.grading_queue.unsubscribe(job_id, changed)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,16 +4,18 @@ import os
 import base64
 import json
 import re
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
 from typing import List, Dict, Optional
 from bson import ObjectId
 from datetime import datetime
 
 from pydantic import BaseModel
-from backend import models, utils, database
+from backend import models, utils, database, content_cache, content_index, pagination, user_stats
 
 router = APIRouter(prefix="/api/interview", tags=["Interview"], redirect_slashes=False)
 
+INTERVIEW_SUMMARY_FIELDS = {"title": None, "description": None, "difficulty": None, "tags": None, "duration_minutes": None}
+
 # Google Generative AI setup
 import google.generativeai as genai
 
@@ -105,32 +107,38 @@ async def evaluate_with_ai(question: str, correct_answer: str, user_answer: str)
         }
 
 @router.get("", response_model=List[dict])
-async def get_all_interviews(current_user: dict = Depends(utils.get_current_user)):
-    interviews = await database.interviews_collection.find().to_list(length=100)
-    for interview in interviews:
-        interview["_id"] = str(interview["_id"])
-    return interviews
+async def get_all_interviews(request: Request, current_user: dict = Depends(utils.get_current_user)):
+    cached = await content_cache.interviews.listing()
+    return content_cache.respond(request, cached)
+
+@router.get("/summary", response_model=models.ContentSummaryPage)
+async def get_interview_summaries(
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    return await pagination.summary_page(database.interviews_collection, INTERVIEW_SUMMARY_FIELDS, limit, cursor)
 
 @router.get("/{interview_id}", response_model=dict)
-async def get_interview_details(interview_id: str, current_user: dict = Depends(utils.get_current_user)):
+async def get_interview_details(interview_id: str, request: Request, current_user: dict = Depends(utils.get_current_user)):
     if not ObjectId.is_valid(interview_id):
         raise HTTPException(status_code=400, detail="Invalid interview ID")
     
-    interview = await database.interviews_collection.find_one({"_id": ObjectId(interview_id)})
-    if not interview:
+    cached = await content_cache.interviews.item(interview_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Interview not found")
     
-    interview["_id"] = str(interview["_id"])
-    return interview
+    return content_cache.respond(request, cached)
 
 @router.post("/start/{interview_id}", response_model=dict)
 async def start_interview_session(interview_id: str, current_user: dict = Depends(utils.get_current_user)):
     if not ObjectId.is_valid(interview_id):
         raise HTTPException(status_code=400, detail="Invalid interview ID")
     
-    interview = await database.interviews_collection.find_one({"_id": ObjectId(interview_id)})
-    if not interview:
+    cached = await content_cache.interviews.item(interview_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Interview not found")
+    interview = cached.data  # client view, expected answers stripped
     
     # Create interview session
     session_data = {
@@ -173,18 +181,18 @@ async def evaluate_answer(
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Get interview question
-    interview = await database.interviews_collection.find_one({"_id": ObjectId(session["interview_id"])})
+    interview = await content_index.interviews.get(session["interview_id"])
     if not interview:
         raise HTTPException(status_code=404, detail="Interview not found")
     
-    question = next((q for q in interview["questions"] if q["id"] == question_id), None)
+    question = interview.question(question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
     
     # Evaluate with AI
     evaluation = await evaluate_with_ai(
-        question["text"],
-        question.get("expected_answer", ""),
+        question.text,
+        question.expected_answer,
         user_answer
     )
     
@@ -264,13 +272,13 @@ async def submit_interview(submission: InterviewSubmission, current_user: dict =
     final_score = round(sum(scores) / len(scores), 1) if scores else 3.0
     
     # Get interview details
-    interview = await database.interviews_collection.find_one({"_id": ObjectId(session["interview_id"])})
+    interview = await content_index.interviews.get(session["interview_id"])
     
     # Save interview result
     result_data = {
         "user_id": str(current_user["_id"]),
         "interview_id": session["interview_id"],
-        "interview_title": interview["title"] if interview else "Unknown Interview",
+        "interview_title": interview.title if interview else "Unknown Interview",
         "session_id": session_id,
         "final_score": final_score,
         "evaluations": evaluations,
@@ -279,7 +287,11 @@ async def submit_interview(submission: InterviewSubmission, current_user: dict =
         "type": "interview"
     }
     
-    await database.interview_results_collection.insert_one(result_data)
+    inserted = await database.interview_results_collection.insert_one(result_data)
+    await user_stats.record(
+        result_data["user_id"], "interview", str(inserted.inserted_id), final_score * 20,
+        interview.tags if interview else (), result_data["submitted_at"]
+    )
     
     return {
         "success": True,
@@ -0,0 +1,14 @@
+# backend/routers/judge0.py
+import secrets
+from fastapi import APIRouter, HTTPException
+from backend import judge0
+
+router = APIRouter(prefix="/api/judge0", tags=["Execution"])
+
+@router.put("/callback/{secret}", response_model=dict)
+async def judge0_callback(secret: str, payload: dict):
+    # Judge0 PUTs each finished submission here when created with a callback_url
+    if not secrets.compare_digest(secret, judge0.CALLBACK_SECRET):
+        raise HTTPException(status_code=404, detail="Not found")
+    judge0.resolve_callback(payload)
+    return {"success": True}
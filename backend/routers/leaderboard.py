@@ -0,0 +1,49 @@
+# backend/routers/leaderboard.py
+from typing import Literal, Optional
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query
+from backend import content_index, database, utils
+from backend.leaderboard import leaderboards
+
+router = APIRouter(prefix="/api/leaderboard", tags=["Leaderboard"])
+
+INDEXES = {"exam": content_index.exams, "test": content_index.tests}
+
+async def _board(kind: str, content_id: str):
+    # Only existing content gets a board, so arbitrary ids can't grow the in-memory set
+    if not ObjectId.is_valid(content_id) or await INDEXES[kind].get(content_id) is None:
+        raise HTTPException(status_code=404, detail=f"{kind.capitalize()} not found")
+    return await leaderboards.board(kind, content_id)
+
+@router.get("/{kind}/{content_id}", response_model=dict)
+async def get_leaderboard(
+    kind: Literal["exam", "test"],
+    content_id: str,
+    limit: int = Query(10, ge=1, le=100),
+    current_user: dict = Depends(utils.get_current_user)
+):
+    """Top scores (each user's best) plus the caller's own rank and percentile."""
+    board = await _board(kind, content_id)
+    entries = board.top(limit)
+    user_ids = [ObjectId(user_id) for _, user_id, _ in entries if ObjectId.is_valid(user_id)]
+    users = await database.users_collection.find({"_id": {"$in": user_ids}}, {"username": 1}).to_list(length=len(user_ids))
+    names = {str(user["_id"]): user.get("username") for user in users}
+    me = str(current_user["_id"])
+    return {
+        "participants": board.participants,
+        "entries": [
+            {"rank": rank, "username": names.get(user_id), "score": score, "is_you": user_id == me}
+            for rank, user_id, score in entries
+        ],
+        "you": board.standing(me),
+    }
+
+@router.get("/{kind}/{content_id}/me", response_model=Optional[dict])
+async def get_my_standing(
+    kind: Literal["exam", "test"],
+    content_id: str,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    """Rank, percentile and best score, or null before the first graded submission."""
+    board = await _board(kind, content_id)
+    return board.standing(str(current_user["_id"]))
@@ -1,21 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import List, Optional
 from bson import ObjectId
-from backend import models, utils, database
+from backend import models, utils, database, content_cache, pagination
 
 router = APIRouter(prefix="/api/practice", tags=["Practice"])
 
+PRACTICE_SUMMARY_FIELDS = {"title": None, "difficulty": None, "tags": None}
+
 @router.get("/", response_model=List[models.PracticeModel])
-async def get_all_practice_questions(current_user: dict = Depends(utils.get_current_user)):
-    practice_cursor = database.practice_collection.find()
-    questions = await practice_cursor.to_list(100)
-    return questions
+async def get_all_practice_questions(request: Request, current_user: dict = Depends(utils.get_current_user)):
+    cached = await content_cache.practice.listing()
+    return content_cache.respond(request, cached)
+
+@router.get("/summary", response_model=models.ContentSummaryPage)
+async def get_practice_summaries(
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    return await pagination.summary_page(database.practice_collection, PRACTICE_SUMMARY_FIELDS, limit, cursor)
 
 @router.get("/{question_id}", response_model=models.PracticeModel)
-async def get_practice_question(question_id: str, current_user: dict = Depends(utils.get_current_user)):
+async def get_practice_question(question_id: str, request: Request, current_user: dict = Depends(utils.get_current_user)):
     if not ObjectId.is_valid(question_id):
         raise HTTPException(status_code=400, detail="Invalid question ID")
-    question = await database.practice_collection.find_one({"_id": ObjectId(question_id)})
-    if not question:
+    cached = await content_cache.practice.item(question_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Practice question not found")
-    return question
\ No newline at end of file
+    return content_cache.respond(request, cached)
\ No newline at end of file
@@ -1,108 +1,146 @@
 # backend/routers/tests.py
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from bson import ObjectId
 from datetime import datetime
-from backend import models, utils, database
-import httpx
+from backend import models, utils, database, content_cache, content_index, execution, grading, pagination, user_stats
+from backend.http_client import OutboundClient, get_outbound_client, outbound
+from backend.leaderboard import leaderboards
 import base64
-import os
 
 router = APIRouter(prefix="/api/tests", tags=["Tests"])
 
-JUDGE0_URL = os.getenv("JUDGE0_URL", "http://localhost:2358")  # your Judge0 API
-
-async def run_code_against_testcases(source_code: str, language_id: int, test_cases: list):
-    """Run user code against all test cases using Judge0."""
-    results = []
-    async with httpx.AsyncClient() as client:
-        for tc in test_cases:
-            payload = {
-                "source_code": source_code,
-                "language_id": language_id,
-                "stdin": tc["input"],
-                "expected_output": tc["output"]
-            }
-            resp = await client.post(f"{JUDGE0_URL}/submissions?wait=true", json=payload)
-            data = resp.json()
-            results.append(data)
-    return results
+ATTEMPT_PAGE_SIZE = 50  # the history page size before pagination existed
+# Enough for AttemptResponse; answers and per-question scores stay in Mongo
+ATTEMPT_FIELDS = {"test_id": 1, "test_name": 1, "score": 1, "submitted_at": 1}
+
+TEST_SUMMARY_FIELDS = {
+    "title": None, "description": None, "difficulty": None, "tags": None,
+    "duration_minutes": None, "language": None, "pass_criteria": 80,
+}
+
+async def run_code_against_testcases(source_code: str, language_id: int, test_cases: list, client: OutboundClient):
+    """Run user code against all test cases on the self-hosted Judge0 (or the local backend).
+
+    Results come back in the same order as test_cases. Cases already run with
+    the same code are answered from the execution cache.
+    """
+    return await execution.run_cases("judge0", source_code, language_id, test_cases, client)
 
 @router.get("/", response_model=List[models.TestModel])
-async def get_all_tests(current_user: dict = Depends(utils.get_current_user)):
-    tests_cursor = database.tests_collection.find()
-    tests = await tests_cursor.to_list(100)
-    for test in tests:
-        test["_id"] = str(test["_id"])
-        if "pass_criteria" not in test:
-            test["pass_criteria"] = 80
-    return tests
+async def get_all_tests(request: Request, current_user: dict = Depends(utils.get_current_user)):
+    # The content cache fills in pass_criteria for tests stored without one
+    cached = await content_cache.tests.listing()
+    return content_cache.respond(request, cached)
 
-@router.get("/{test_id}", response_model=models.TestModel)
-async def get_test_details(test_id: str, current_user: dict = Depends(utils.get_current_user)):
-    if not ObjectId.is_valid(test_id):
-        raise HTTPException(status_code=400, detail="Invalid test ID")
-    test = await database.tests_collection.find_one({"_id": ObjectId(test_id)})
-    if not test:
-        raise HTTPException(status_code=404, detail="Test not found")
-    test["_id"] = str(test["_id"])
-    if "pass_criteria" not in test:
-        test["pass_criteria"] = 80
-    return test
+@router.get("/summary", response_model=models.ContentSummaryPage)
+async def get_test_summaries(
+    limit: int = Query(pagination.DEFAULT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    return await pagination.summary_page(database.tests_collection, TEST_SUMMARY_FIELDS, limit, cursor)
 
-@router.post("/{test_id}/submit", response_model=dict)
-async def submit_test(test_id: str, submission: dict, current_user: dict = Depends(utils.get_current_user)):
+@router.get("/{test_id}", response_model=models.TestModel)
+async def get_test_details(test_id: str, request: Request, current_user: dict = Depends(utils.get_current_user)):
     if not ObjectId.is_valid(test_id):
         raise HTTPException(status_code=400, detail="Invalid test ID")
-    test = await database.tests_collection.find_one({"_id": ObjectId(test_id)})
-    if not test:
+    cached = await content_cache.tests.item(test_id)
+    if not cached:
         raise HTTPException(status_code=404, detail="Test not found")
+    return content_cache.respond(request, cached)
 
-    total_questions = len(test["questions"])
+async def grade_test(
+    test: content_index.ContentRecord,
+    user_id: str,
+    answers: dict,
+    client: OutboundClient,
+    job: Optional[dict] = None
+) -> dict:
+    """Scores a submission and records the attempt (and certification, if passed)."""
+    total_questions = test.question_count
     total_score = 0.0
+    question_scores = {}  # per-question credit, kept so a re-grade can re-score parts of an attempt
+    case_fingerprints = {}
 
-    for question in test["questions"]:
-        answer_code = submission.get("answers", {}).get(question["id"], "")
-        if question["question_type"] == "coding":
-            all_cases = question.get("test_cases", [])
+    for question in test.questions:
+        answer_code = answers.get(question.id, "")
+        if question.question_type == "coding":
+            all_cases = list(question.all_cases)
             if not answer_code.strip() or not all_cases:
                 continue
             encoded_code = base64.b64encode(answer_code.encode()).decode()
-            results = await run_code_against_testcases(encoded_code, 71, all_cases)  # 71 = Python
+            results = await run_code_against_testcases(encoded_code, 71, all_cases, client)  # 71 = Python
             passed = sum(1 for r in results if r["status"]["description"] == "Accepted")
+            question_scores[question.id] = passed / len(all_cases)
+            case_fingerprints[question.id] = question.cases_fingerprint
             total_score += passed / len(all_cases)
-        elif question["question_type"] == "mcq":
-            if answer_code and "correct_answer" in question and answer_code == question["correct_answer"]:
+        elif question.question_type == "mcq":
+            if answer_code and question.correct_answer is not None and answer_code == question.correct_answer:
+                question_scores[question.id] = 1
                 total_score += 1
 
     final_score = (total_score / total_questions) * 100 if total_questions else 0
-    passed = final_score >= test.get("pass_criteria", 80)
+    passed = final_score >= test.pass_criteria
 
     attempt_data = {
-        "user_id": str(current_user["_id"]),
-        "test_id": test_id,
-        "test_name": test["title"],
+        "user_id": user_id,
+        "test_id": test.id,
+        "test_name": test.title,
         "score": round(final_score, 2),
-        "submitted_at": datetime.utcnow(),
-        "answers": submission.get("answers", {})
+        "submitted_at": job["created_at"] if job else datetime.utcnow(),
+        "answers": answers,
+        "question_scores": question_scores,
+        "case_fingerprints": case_fingerprints
     }
-    result = await database.attempts_collection.insert_one(attempt_data)
+    attempt_id = await grading.insert_once(database.attempts_collection, attempt_data, job)
+    await user_stats.record(user_id, "test", str(attempt_id), attempt_data["score"], test.tags, attempt_data["submitted_at"])
+    leaderboards.record("test", test.id, user_id, attempt_data["score"])
 
     certification_awarded = False
     if passed:
         cert = {
-            "user_id": str(current_user["_id"]),
-            "test_id": test_id,
-            "test_name": test["title"],
+            "user_id": user_id,
+            "test_id": test.id,
+            "test_name": test.title,
             "score": round(final_score, 2),
             "awarded_at": datetime.utcnow(),
-            "attempt_id": str(result.inserted_id)
+            "attempt_id": str(attempt_id)
         }
-        await database.certifications_collection.insert_one(cert)
+        await grading.insert_once(database.certifications_collection, cert, job)
         certification_awarded = True
 
     return {"success": True, "score": round(final_score, 2), "passed": passed, "certification_awarded": certification_awarded}
 
+@grading.handler("test")
+async def grade_test_job(job: dict) -> dict:
+    test = await content_index.tests.get(job["payload"]["test_id"])
+    if not test:
+        raise HTTPException(status_code=404, detail="Test not found")
+    return await grade_test(test, job["user_id"], job["payload"]["answers"], outbound, job)
+
+@router.post("/{test_id}/submit", response_model=dict)
+async def submit_test(
+    test_id: str,
+    submission: dict,
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(utils.get_current_user),
+    client: OutboundClient = Depends(get_outbound_client)
+):
+    if not ObjectId.is_valid(test_id):
+        raise HTTPException(status_code=400, detail="Invalid test ID")
+    test = await content_index.tests.get(test_id)
+    if not test:
+        raise HTTPException(status_code=404, detail="Test not found")
+
+    answers = submission.get("answers", {})
+    if grading.wants_queue(request):
+        job = await grading.grading_queue.enqueue("test", str(current_user["_id"]), {"test_id": test_id, "answers": answers})
+        response.status_code = 202
+        return {"success": True, "job_id": job["_id"], "status": job["status"], "status_url": f"/api/grading/jobs/{job['_id']}"}
+    return await grade_test(test, str(current_user["_id"]), answers, client)
+
 @router.get("/user/certifications", response_model=List[models.CertificationResponse])
 async def get_user_certifications(current_user: dict = Depends(utils.get_current_user)):
     certs = await database.certifications_collection.find({"user_id": str(current_user["_id"])}).to_list(50)
@@ -112,13 +150,29 @@ async def get_user_certifications(current_user: dict = Depends(utils.get_current
     return certs
 
 @router.get("/user/attempts", response_model=List[models.AttemptResponse])
-async def get_user_attempts(current_user: dict = Depends(utils.get_current_user)):
-    attempts = await database.attempts_collection.find({"user_id": str(current_user["_id"])}).to_list(50)
+async def get_user_attempts(
+    response: Response,
+    limit: int = Query(ATTEMPT_PAGE_SIZE, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(utils.get_current_user)
+):
+    """Newest attempts first. When more exist, X-Next-Cursor holds the cursor for the next page."""
+    query = {"user_id": str(current_user["_id"]), **pagination.before_filter(pagination.decode_cursor(cursor), "submitted_at")}
+    attempts = await database.attempts_collection.find(query, ATTEMPT_FIELDS) \
+        .sort([("submitted_at", -1), ("_id", -1)]).limit(limit + 1).to_list(length=limit + 1)
+    if len(attempts) > limit:
+        attempts = attempts[:limit]
+        response.headers["X-Next-Cursor"] = pagination.before_cursor(attempts[-1], "submitted_at")
+
+    # Titles and question counts come from the compiled content index, not one find_one per attempt
+    records = {}
+    for test_id in {attempt["test_id"] for attempt in attempts}:
+        records[test_id] = await content_index.tests.get(test_id) if ObjectId.is_valid(test_id) else None
     for attempt in attempts:
         attempt["id"] = str(attempt["_id"])
         attempt["_id"] = str(attempt["_id"])
-        test = await database.tests_collection.find_one({"_id": ObjectId(attempt["test_id"])})
+        test = records.get(attempt["test_id"])
         if test:
-            attempt["test_title"] = test["title"]
-            attempt["total_questions"] = len(test["questions"])
+            attempt["test_title"] = test.title
+            attempt["total_questions"] = test.question_count
     return attempts
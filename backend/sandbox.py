@@ -0,0 +1,206 @@
+# backend/sandbox.py
+# Local execution backend for Python submissions (Judge0 language 71). A pool
+# of long-lived sandbox_worker.py processes is started ahead of time; each run
+# is forked from a warm worker under CPU, memory, output and wall-clock limits
+# with networking blocked, and comes back as a Judge0-shaped result dict so the
+# "Accepted" checks in the graders work unchanged.
+#
+# Workers start with an empty environment apart from PATH and LANG, so no
+# secret reaches a submission. Each run gets no new processes (RLIMIT_NPROC 0)
+# and, when the API runs as root, the uid of LOCAL_SANDBOX_USER. That is still
+# not an isolation boundary: a submission can read any world-readable file
+# and the audit hook is only a speed bump. The backend is for trusted code
+# (local development, staff-authored content) and stays off unless
+# EXECUTION_BACKEND=local; use Judge0 or a container/nsjail sandbox for
+# candidates' submissions.
+import asyncio
+import base64
+import json
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from backend import metrics
+
+LOCAL_SANDBOX_WORKERS = int(os.getenv("LOCAL_SANDBOX_WORKERS", str(os.cpu_count() or 2)))
+LOCAL_SANDBOX_CPU_SECONDS = float(os.getenv("LOCAL_SANDBOX_CPU_SECONDS", "2"))
+LOCAL_SANDBOX_WALL_SECONDS = float(os.getenv("LOCAL_SANDBOX_WALL_SECONDS", "5"))
+LOCAL_SANDBOX_MEMORY_MB = int(os.getenv("LOCAL_SANDBOX_MEMORY_MB", "256"))
+LOCAL_SANDBOX_OUTPUT_KB = int(os.getenv("LOCAL_SANDBOX_OUTPUT_KB", "64"))
+# Unprivileged user submissions run as when the API itself runs as root
+LOCAL_SANDBOX_USER = os.getenv("LOCAL_SANDBOX_USER", "nobody")
+
+WORKER_PATH = str(Path(__file__).resolve().parent / "sandbox_worker.py")
+# The whole environment workers start with: nothing of the API's (JWT_SECRET, MONGODB_URI, API keys)
+WORKER_ENV = {"PATH": os.getenv("PATH", os.defpath), "LANG": os.getenv("LANG", "C.UTF-8")}
+
+# Judge0 status ids/descriptions used by the graders
+STATUSES = {
+    3: "Accepted",
+    4: "Wrong Answer",
+    5: "Time Limit Exceeded",
+    6: "Compilation Error",
+    7: "Runtime Error (SIGSEGV)",
+    8: "Runtime Error (SIGXFSZ)",
+    9: "Runtime Error (SIGFPE)",
+    10: "Runtime Error (SIGABRT)",
+    11: "Runtime Error (NZEC)",
+    12: "Runtime Error (Other)",
+    13: "Internal Error",
+}
+SIGNAL_STATUS = {signal.SIGSEGV: 7, signal.SIGXFSZ: 8, signal.SIGFPE: 9, signal.SIGABRT: 10}
+
+
+def _status(status_id: int) -> dict:
+    return {"id": status_id, "description": STATUSES[status_id]}
+
+
+def _decode(value: Optional[str]) -> str:
+    return base64.b64decode(value or "").decode("utf-8", errors="replace")
+
+
+def to_judge0_result(raw: dict, expected_output_b64: Optional[str]) -> dict:
+    """Maps a worker result onto Judge0's response fields (base64 encoded, like the requests)."""
+    if "internal_error" in raw:
+        message = base64.b64encode(raw["internal_error"].encode("utf-8")).decode("ascii")
+        return {"stdout": None, "stderr": None, "message": message, "status": _status(13)}
+    if "compile_output" in raw:
+        return {"stdout": None, "stderr": None, "compile_output": raw["compile_output"], "status": _status(6)}
+
+    if raw["timed_out"]:
+        status_id = 5
+    elif raw["output_exceeded"]:
+        status_id = 8
+    elif raw["signal"] in (signal.SIGXCPU, signal.SIGKILL):
+        status_id = 5  # CPU rlimit: SIGXCPU at the soft limit, SIGKILL at the hard one
+    elif raw["signal"] is not None:
+        status_id = SIGNAL_STATUS.get(raw["signal"], 12)
+    elif raw["exit_code"] != 0:
+        status_id = 11
+    elif expected_output_b64 is not None:
+        # Judge0 ignores trailing whitespace when comparing
+        matches = _decode(raw["stdout"]).rstrip() == _decode(expected_output_b64).rstrip()
+        status_id = 3 if matches else 4
+    else:
+        status_id = 3
+    return {
+        "stdout": raw["stdout"] or None,
+        "stderr": raw["stderr"] or None,
+        "exit_code": raw["exit_code"],
+        "time": str(raw["time"]),
+        "memory": raw["memory"],
+        "status": _status(status_id),
+    }
+
+
+class SandboxWorker:
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+
+    @property
+    def alive(self) -> bool:
+        return self.process.returncode is None
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+
+
+class LocalPythonBackend:
+    """Pre-forked pool of sandbox workers running Python submissions locally."""
+
+    name = "local"
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.job = {
+            "cpu_seconds": LOCAL_SANDBOX_CPU_SECONDS,
+            "wall_seconds": LOCAL_SANDBOX_WALL_SECONDS,
+            "memory_bytes": LOCAL_SANDBOX_MEMORY_MB * 1024 * 1024,
+            "output_bytes": LOCAL_SANDBOX_OUTPUT_KB * 1024,
+        }
+        self.runs = 0
+        self.respawns = 0
+        self.waiting = 0
+        self._timer = metrics.OperationTimer()
+        self._idle: Optional[asyncio.Queue] = None
+        self._all: List[SandboxWorker] = []
+
+    async def _spawn(self) -> SandboxWorker:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-I", WORKER_PATH, LOCAL_SANDBOX_USER,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            limit=4 * self.job["output_bytes"] + 65536,  # one result line holds both streams, base64'd
+            env=WORKER_ENV,
+        )
+        worker = SandboxWorker(process)
+        self._all.append(worker)
+        return worker
+
+    async def start(self):
+        """Spawns the whole pool up front so the first runs don't pay interpreter start-up."""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self._idle.put_nowait(await self._spawn())
+
+    async def close(self):
+        for worker in self._all:
+            worker.kill()
+            await worker.process.wait()
+        self._all = []
+        self._idle = None
+
+    async def _run_one(self, submission: dict) -> dict:
+        await self.start()
+        self.waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self.waiting -= 1
+        start = time.perf_counter()
+        try:
+            job = {**self.job, "source_code": submission["source_code"], "stdin": submission.get("stdin")}
+            worker.process.stdin.write(json.dumps(job).encode("utf-8") + b"\n")
+            await worker.process.stdin.drain()
+            # The worker enforces the wall clock itself; this only catches a wedged worker
+            line = await asyncio.wait_for(worker.process.stdout.readline(), LOCAL_SANDBOX_WALL_SECONDS + 5)
+            if not line:
+                raise RuntimeError("sandbox worker exited")
+            raw = json.loads(line)
+        except (asyncio.TimeoutError, RuntimeError, ConnectionError, ValueError) as e:
+            worker.kill()
+            raw = {"internal_error": f"{type(e).__name__}: {e}"}
+        finally:
+            self._timer.observe(time.perf_counter() - start)
+            self.runs += 1
+            if not worker.alive:
+                self._all.remove(worker)
+                worker = await self._spawn()
+                self.respawns += 1
+            self._idle.put_nowait(worker)
+        return to_judge0_result(raw, submission.get("expected_output"))
+
+    async def run(self, submissions: List[dict]) -> List[dict]:
+        return await asyncio.gather(*(self._run_one(sub) for sub in submissions))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "idle": self._idle.qsize() if self._idle is not None else 0,
+            "waiting": self.waiting,
+            "runs": self.runs,
+            "respawns": self.respawns,
+            "limits": self.job,
+            "run": self._timer.snapshot(),
+        }
+
+
+local_backend = LocalPythonBackend(LOCAL_SANDBOX_WORKERS)
+metrics.register("local_sandbox", local_backend.stats)
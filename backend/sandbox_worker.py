@@ -0,0 +1,223 @@
+# backend/sandbox_worker.py
+# Pre-forked worker for the local execution backend (see backend/sandbox.py).
+# Started as `python -I backend/sandbox_worker.py USER`; it reads one JSON job per
+# line on stdin and writes one JSON result per line on stdout. Each job is
+# compiled here and run in a forked child, so the interpreter and common
+# modules are already warm and a run costs a fork instead of a cold start.
+#
+# This file must stay stdlib-only: it never imports anything from backend.
+import base64
+import ctypes
+import json
+import os
+import pwd
+import resource
+import select
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+# Imported once in the worker so every forked child inherits them
+WARM_MODULES = ("bisect", "collections", "functools", "heapq", "itertools", "math", "re", "string")
+
+# Audit events a submission may not trigger. This only turns away the
+# obvious routes (low-level calls such as _posixsubprocess.fork_exec raise
+# no event); the actual limits on process creation are RLIMIT_NPROC and the
+# unprivileged uid set in _run_child.
+BLOCKED_EVENTS = (
+    "socket.", "subprocess.", "os.system", "os.exec", "os.posix_spawn", "os.spawn",
+    "os.fork", "os.forkpty", "os.kill", "os.killpg", "ctypes.", "sys.addaudithook",
+)
+
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+
+# Loaded in the worker; children only call unshare() through it before the audit hook goes in
+_libc = ctypes.CDLL(None, use_errno=True)
+
+
+def _audit(event, args):
+    if event.startswith(BLOCKED_EVENTS):
+        raise PermissionError(f"{event} is not permitted in the sandbox")
+
+
+def _drop_network():
+    """Moves the child into an empty network namespace when the kernel allows it."""
+    global _libc
+    try:
+        if _libc.unshare(CLONE_NEWNET) != 0:
+            _libc.unshare(CLONE_NEWUSER | CLONE_NEWNET)
+    except Exception:
+        pass  # the audit hook still refuses socket creation
+    _libc = None
+
+
+def _sandbox_ids(user):
+    """(uid, gid) to run submissions as when the worker is root, else None."""
+    if os.geteuid() != 0:
+        return None
+    entry = pwd.getpwnam(user)
+    return entry.pw_uid, entry.pw_gid
+
+
+def _run_child(code, job, stdin_fd, stdout_fd, stderr_fd, workdir, ids):
+    """Never returns: sets limits, runs the submission and exits with its status."""
+    exit_code = 1
+    try:
+        os.dup2(stdin_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        os.closerange(3, 1024)
+        os.chdir(workdir)
+        os.setsid()
+
+        cpu = max(1, int(job["cpu_seconds"] + 0.999))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (job["memory_bytes"], job["memory_bytes"]))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (job["output_bytes"], job["output_bytes"]))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        _drop_network()
+        if ids is not None:
+            os.setgroups([])
+            os.setgid(ids[1])
+            os.setuid(ids[0])
+        # After the uid change: root ignores the limit. Threads count too.
+        resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+        os.environ.clear()
+        for name in [n for n in sys.modules if n == "ctypes" or n.startswith("ctypes.")]:
+            del sys.modules[name]
+        sys.addaudithook(_audit)
+
+        # Fresh stream objects: the worker's own sys.stdin may hold buffered job lines
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", closefd=False)
+        try:
+            exec(code, {"__name__": "__main__", "__builtins__": __builtins__})
+            exit_code = 0
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                exit_code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                exit_code = 1
+        except BaseException:
+            # Drop this frame so the traceback starts in the submission
+            etype, value, tb = sys.exc_info()
+            traceback.print_exception(etype, value, tb.tb_next)
+            exit_code = 1
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            pass
+    finally:
+        os._exit(exit_code)
+
+
+def _collect(pid, stdin_data, stdin_w, stdout_r, stderr_r, job):
+    """Feeds stdin and drains output until the child exits, hits the wall clock or the output cap."""
+    deadline = time.monotonic() + job["wall_seconds"]
+    chunks = {stdout_r: [], stderr_r: []}
+    readers = [stdout_r, stderr_r]
+    writers = [stdin_w] if stdin_data else []
+    if not stdin_data:
+        os.close(stdin_w)
+    total = 0
+    timed_out = output_exceeded = False
+
+    while readers:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        readable, writable, _ = select.select(readers, writers, [], remaining)
+        if writable:
+            try:
+                written = os.write(stdin_w, stdin_data[:65536])
+                stdin_data = stdin_data[written:]
+            except BrokenPipeError:
+                stdin_data = b""
+            if not stdin_data:
+                writers = []
+                os.close(stdin_w)
+        for fd in readable:
+            data = os.read(fd, 65536)
+            if not data:
+                readers.remove(fd)
+                continue
+            chunks[fd].append(data)
+            total += len(data)
+        if total > job["output_bytes"]:
+            output_exceeded = True
+            break
+
+    if readers:  # stopped early: the child is still running
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            os.kill(pid, signal.SIGKILL)
+    if writers:
+        os.close(stdin_w)
+    _, status, usage = os.wait4(pid, 0)
+    for fd in (stdout_r, stderr_r):
+        os.close(fd)
+
+    limit = job["output_bytes"]
+    return {
+        "stdout": base64.b64encode(b"".join(chunks[stdout_r])[:limit]).decode("ascii"),
+        "stderr": base64.b64encode(b"".join(chunks[stderr_r])[:limit]).decode("ascii"),
+        "exit_code": os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+        "signal": os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+        "timed_out": timed_out,
+        "output_exceeded": output_exceeded,
+        "time": round(usage.ru_utime + usage.ru_stime, 3),
+        "memory": usage.ru_maxrss,  # KiB on Linux
+    }
+
+
+def run_job(job, workdir, ids=None):
+    source = base64.b64decode(job["source_code"]).decode("utf-8", errors="replace")
+    try:
+        code = compile(source, "main.py", "exec")
+    except (SyntaxError, ValueError):
+        message = traceback.format_exc(limit=0).encode("utf-8")
+        return {"compile_output": base64.b64encode(message).decode("ascii")}
+
+    stdin_data = base64.b64decode(job.get("stdin") or "")
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        _run_child(code, job, stdin_r, stdout_w, stderr_w, workdir, ids)
+    for fd in (stdin_r, stdout_w, stderr_w):
+        os.close(fd)
+    return _collect(pid, stdin_data, stdin_w, stdout_r, stderr_r, job)
+
+
+def main():
+    for module in WARM_MODULES:
+        __import__(module)
+    ids = _sandbox_ids(sys.argv[1] if len(sys.argv) > 1 else "nobody")
+    workdir = tempfile.mkdtemp(prefix="sandbox-")  # empty, and the submission's cwd
+    if ids is not None:
+        os.chown(workdir, *ids)
+    jobs, results = sys.stdin.buffer, sys.stdout.buffer
+    while True:
+        line = jobs.readline()
+        if not line:
+            break
+        try:
+            result = run_job(json.loads(line), workdir, ids)
+        except Exception as e:
+            result = {"internal_error": f"{type(e).__name__}: {e}"}
+        results.write(json.dumps(result).encode("utf-8") + b"\n")
+        results.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 import os
 from dotenv import load_dotenv
+from backend import content_cache
 
 load_dotenv()
 
@@ -197,6 +198,7 @@ async def seed():
     
     print("Seeding new exams with correct answers...")
     await exams_collection.insert_many(dummy_exams)
+    await content_cache.changed("exams")  # running API processes reload the catalog
     print("Seeding complete.")
     client.close()
 
@@ -6,6 +6,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 import os
 from dotenv import load_dotenv
+from backend import content_cache
 
 load_dotenv()
 
@@ -170,6 +171,7 @@ async def seed_interviews():
     
     print("Seeding new interviews...")
     await interviews_collection.insert_many(dummy_interviews)
+    await content_cache.changed("interviews")  # running API processes reload the catalog
     print("Interview seeding complete.")
     client.close()
 
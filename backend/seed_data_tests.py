@@ -6,6 +6,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
 import os
 from dotenv import load_dotenv
+from backend import content_cache
 
 load_dotenv()
 
@@ -165,6 +166,7 @@ async def seed_tests():
     
     print("Seeding new tests...")
     await tests_collection.insert_many(dummy_tests)
+    await content_cache.changed("tests")  # running API processes reload the catalog
     print("Test seeding complete.")
     client.close()
 
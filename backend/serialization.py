@@ -0,0 +1,34 @@
+# backend/serialization.py
+# Encode-once helpers for large, rarely changing response bodies. Content is
+# validated against its response model a single time when it is loaded and the
+# resulting JSON bytes are reused until the document version changes.
+from functools import lru_cache
+from typing import Any, Iterable
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+class RawJSONResponse(Response):
+    """Sends already-encoded JSON bytes without re-validating or re-encoding them."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content
+
+
+@lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+def encode(model, data) -> bytes:
+    """Validates data against model and returns its JSON encoding, as response_model would."""
+    adapter = _adapter(model)
+    return adapter.dump_json(adapter.validate_python(data), by_alias=True)
+
+
+def join_array(encoded_items: Iterable[bytes]) -> bytes:
+    """Builds a JSON array from individually encoded items without touching them again."""
+    return b"[" + b",".join(encoded_items) + b"]"
@@ -1,10 +1,17 @@
 # backend/server.py
 # uvicorn backend.main:app --reload --port 5000
 
-from fastapi import FastAPI
+import os
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.routers import auth, exams, practice, tests, interview
+from backend.routers import auth, exams, practice, tests, interview, judge0, grading, dashboard, leaderboard, export
 from backend.database import db
+from backend.passwords import password_hasher
+from backend.http_client import outbound
+from backend import metrics, indexes, execution, utils
+from backend.grading import grading_queue
+from backend.leaderboard import leaderboards
 
 app = FastAPI(title="Evalytics-AI Backend")
 
@@ -29,6 +36,11 @@ app.include_router(exams.router)
 app.include_router(practice.router)
 app.include_router(tests.router)
 app.include_router(interview.router)
+app.include_router(judge0.router)
+app.include_router(grading.router)
+app.include_router(dashboard.router)
+app.include_router(leaderboard.router)
+app.include_router(export.router)
 
 # --------------------------
 # Startup / Shutdown Events
@@ -36,6 +48,17 @@ app.include_router(interview.router)
 @app.on_event("startup")
 async def startup_db_client():
     print("FastAPI application starting up...")
+    outbound.open()
+    await execution.start()
+    grading_queue.start()
+    leaderboards.start()
+    status = await indexes.ensure_indexes(db)
+    for failure in status["failed"]:
+        print(f"Index build failed for {failure['index']}: {failure['error']}")
+    if status["missing"]:
+        print(f"Missing indexes: {', '.join(status['missing'])}")
+    if status["unused"]:
+        print(f"Indexes with no recorded use: {', '.join(status['unused'])}")
     # Check if interviews collection exists, seed if empty
     if await db["interviews"].count_documents({}) == 0:
         print("Interviews collection is empty - consider seeding data")
@@ -43,10 +66,33 @@ async def startup_db_client():
 @app.on_event("shutdown")
 async def shutdown_db_client():
     print("FastAPI application shutting down...")
+    await grading_queue.close()
+    await leaderboards.close()
+    password_hasher.shutdown()
+    await outbound.close()
+    await execution.close()
 
 # --------------------------
 # Root Endpoint
 # --------------------------
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to Evalytics-AI Backend"}
\ No newline at end of file
+    return {"message": "Welcome to Evalytics-AI Backend"}
+
+@app.get("/ready")
+def read_readiness():
+    status_code = 200 if indexes.index_status["ready"] else 503
+    return JSONResponse(status_code=status_code, content={"indexes": indexes.index_status})
+
+# Metrics expose queue depths, upstream health and per-endpoint traffic, so only these
+# accounts may read them; empty disables the endpoint
+METRICS_ALLOWED_EMAILS = {email.strip().lower() for email in os.getenv("METRICS_ALLOWED_EMAILS", "").split(",") if email.strip()}
+
+async def require_metrics_reader(current_user: dict = Depends(utils.get_current_user)) -> dict:
+    if current_user.get("email", "").lower() not in METRICS_ALLOWED_EMAILS:
+        raise HTTPException(status_code=403, detail="Not allowed to read metrics")
+    return current_user
+
+@app.get("/metrics")
+def read_metrics(current_user: dict = Depends(require_metrics_reader)):
+    return metrics.snapshot()
\ No newline at end of file
@@ -0,0 +1,259 @@
+# backend/user_stats.py
+# python -m backend.user_stats [--user USER_ID ...] [--batch-size 1000]
+#
+# Materialized dashboard statistics, one `user_stats` document per user.
+# Every graded test, exam and interview is folded in with a single update:
+# $inc on counts, score sums and sums of squares (mean and variance follow
+# from those), $max on best scores, and a $push/$slice ring of recent scores.
+# Overall, per-type and per-tag buckets are kept the same way, so reading a
+# user's statistics is one find_one however many attempts they have made.
+# The ring doubles as an idempotency guard: a retried grading job finds its
+# result already in `recent` and changes nothing.
+#
+# Run as a module to rebuild the documents from the stored results (the
+# first time, or after a re-grade). Rebuilding named users (--user, and the
+# re-grade job) only replaces a document whose version hasn't moved since it
+# was read, so it is safe alongside live submissions. A full rebuild
+# replaces every document unconditionally: run it while submissions are quiet.
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from backend import content_index, database, metrics
+
+USER_STATS_RECENT = int(os.getenv("USER_STATS_RECENT", "20"))
+USER_STATS_REBUILD_RETRIES = int(os.getenv("USER_STATS_REBUILD_RETRIES", "5"))
+
+user_stats_collection = database.db["user_stats"]
+
+# kind -> (collection, content id field, score field, factor to a percentage, content index)
+SOURCES = {
+    "test": (database.attempts_collection, "test_id", "score", 1, content_index.tests),
+    "exam": (database.results_collection, "exam_id", "score", 1, content_index.exams),
+    "interview": (database.interview_results_collection, "interview_id", "final_score", 20, content_index.interviews),  # scored 1-5
+}
+
+counters = {"recorded": 0, "duplicates": 0, "errors": 0, "rebuilt_users": 0, "rebuild_conflicts": 0}
+metrics.register("user_stats", lambda: dict(counters))
+
+
+def _tag_key(tag: str) -> str:
+    # Field names can't contain dots or start with $
+    return str(tag).replace(".", "_").lstrip("$") or "_"
+
+
+def _buckets(kind: str, tags: Iterable[str]) -> List[str]:
+    """Dotted paths of every bucket a score counts towards."""
+    return ["overall", f"by_type.{kind}"] + [f"tags.{_tag_key(tag)}" for tag in set(tags or ())]
+
+
+def _entry(kind: str, source_id: str, score: float, submitted_at: datetime) -> dict:
+    return {"id": source_id, "type": kind, "score": score, "at": submitted_at}
+
+
+async def _tags(kind: str, content_id: Optional[str]) -> List[str]:
+    if not content_id or not ObjectId.is_valid(content_id):
+        return []
+    record = await SOURCES[kind][4].get(content_id)
+    return list(record.tags) if record else []
+
+
+async def record(user_id: str, kind: str, source_id: str, score: float, tags: Iterable[str], submitted_at: datetime):
+    """Folds one graded result (score as a percentage) into the user's statistics."""
+    score = float(score)
+    inc, best = {}, {}
+    for bucket in _buckets(kind, tags):
+        inc[f"{bucket}.count"] = 1
+        inc[f"{bucket}.sum"] = score
+        inc[f"{bucket}.sum_sq"] = score * score
+        best[f"{bucket}.best"] = score
+    inc["version"] = 1  # lets a concurrent rebuild_user() notice this update
+    best["last_submitted_at"] = submitted_at
+    update = {
+        "$inc": inc,
+        "$max": best,
+        "$push": {"recent": {"$each": [_entry(kind, source_id, score, submitted_at)], "$slice": -USER_STATS_RECENT}},
+        "$set": {"updated_at": datetime.utcnow()},
+    }
+    query = {"_id": user_id, "recent.id": {"$ne": source_id}}
+    try:
+        try:
+            await user_stats_collection.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            # Either a concurrent first record() created the document between our filter and the
+            # insert, or the filter missed because this result is already in the ring: retry as a
+            # plain update, which only matches in the first case
+            retried = await user_stats_collection.update_one(query, update)
+            if not retried.matched_count:
+                counters["duplicates"] += 1
+                return
+    except PyMongoError as e:
+        # The result itself is saved; a rebuild brings the statistics back in line
+        counters["errors"] += 1
+        print(f"user_stats update failed for {user_id}: {e}")
+        return
+    counters["recorded"] += 1
+
+
+def _summary(bucket: dict) -> dict:
+    count = bucket.get("count", 0)
+    if not count:
+        return {"count": 0, "mean": None, "variance": None, "stddev": None, "best": None}
+    mean = bucket["sum"] / count
+    variance = max(0.0, bucket["sum_sq"] / count - mean * mean)  # population variance
+    return {
+        "count": count,
+        "mean": round(mean, 2),
+        "variance": round(variance, 2),
+        "stddev": round(math.sqrt(variance), 2),
+        "best": bucket.get("best"),
+    }
+
+
+def view(doc: Optional[dict]) -> dict:
+    """API shape of a user_stats document: means and spreads instead of raw sums."""
+    doc = doc or {}
+    recent = doc.get("recent", [])
+    scores = [entry["score"] for entry in recent]
+    trend = None
+    if len(scores) >= 2:
+        half = len(scores) // 2
+        trend = round(sum(scores[half:]) / (len(scores) - half) - sum(scores[:half]) / half, 2)
+    return {
+        "overall": _summary(doc.get("overall", {})),
+        "by_type": {kind: _summary(doc.get("by_type", {}).get(kind, {})) for kind in SOURCES},
+        "tags": {tag: _summary(bucket) for tag, bucket in doc.get("tags", {}).items()},
+        "recent": recent,
+        "trend": trend,  # mean of the newer half of `recent` minus the older half
+        "last_submitted_at": doc.get("last_submitted_at"),
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+async def get(user_id: str) -> dict:
+    return view(await user_stats_collection.find_one({"_id": user_id}))
+
+
+# --- Rebuild ---
+def _fold(doc: dict, kind: str, score: float, tags: Iterable[str], submitted_at: datetime):
+    """In-memory counterpart of record()'s buckets; rebuild() keeps the ring."""
+    for bucket in _buckets(kind, tags):
+        target = doc
+        for part in bucket.split("."):
+            target = target.setdefault(part, {})
+        target["count"] = target.get("count", 0) + 1
+        target["sum"] = target.get("sum", 0.0) + score
+        target["sum_sq"] = target.get("sum_sq", 0.0) + score * score
+        target["best"] = max(target.get("best", score), score)
+    if submitted_at and (doc.get("last_submitted_at") is None or submitted_at > doc["last_submitted_at"]):
+        doc["last_submitted_at"] = submitted_at
+
+
+async def _compute(query: dict, batch_size: int) -> Dict[str, dict]:
+    """Statistics documents folded from every stored result matching query, by user id."""
+    docs: Dict[str, dict] = {}
+    # Per user, a min-heap of the newest USER_STATS_RECENT (submitted_at, id, entry) across all sources
+    rings: Dict[str, List[tuple]] = {}
+    for kind, (collection, content_field, score_field, scale, _) in SOURCES.items():
+        fields = {"user_id": 1, content_field: 1, score_field: 1, "submitted_at": 1}
+        cursor = collection.find(query, fields).batch_size(batch_size)
+        async for result in cursor:
+            score = result.get(score_field)
+            if not isinstance(score, (int, float)) or not result.get("user_id"):
+                continue
+            doc = docs.setdefault(result["user_id"], {"_id": result["user_id"]})
+            tags = await _tags(kind, result.get(content_field))
+            submitted_at = result.get("submitted_at")
+            _fold(doc, kind, float(score) * scale, tags, submitted_at)
+            if submitted_at is not None:
+                ring = rings.setdefault(result["user_id"], [])
+                item = (submitted_at, str(result["_id"]), _entry(kind, str(result["_id"]), float(score) * scale, submitted_at))
+                if len(ring) < USER_STATS_RECENT:
+                    heapq.heappush(ring, item)
+                else:
+                    heapq.heappushpop(ring, item)  # drops the oldest
+
+    for user_id, doc in docs.items():
+        doc["recent"] = [entry for _, _, entry in sorted(rings.get(user_id, []))]
+    return docs
+
+
+async def rebuild_user(user_id: str, batch_size: int = 1000) -> bool:
+    """Recomputes one user's statistics without losing a record() that lands meanwhile.
+
+    The replace only applies if the document's version is still the one read
+    before the results were; otherwise the user is recomputed.
+    """
+    for _ in range(USER_STATS_REBUILD_RETRIES):
+        current = await user_stats_collection.find_one({"_id": user_id}, {"version": 1})
+        seen = current.get("version") if current else None  # None also matches a missing field
+        doc = (await _compute({"user_id": user_id}, batch_size)).get(user_id)
+        if doc is None:
+            if current is None:
+                return True
+            if (await user_stats_collection.delete_one({"_id": user_id, "version": seen})).deleted_count:
+                return True
+            continue
+        doc.update(updated_at=datetime.utcnow(), version=(seen or 0) + 1)
+        try:
+            # No match means a concurrent change: the upsert then collides on _id
+            await user_stats_collection.replace_one({"_id": user_id, "version": seen}, doc, upsert=True)
+        except DuplicateKeyError:
+            continue
+        counters["rebuilt_users"] += 1
+        return True
+    counters["rebuild_conflicts"] += 1
+    print(f"user_stats rebuild for {user_id} kept conflicting with live updates; gave up")
+    return False
+
+
+async def rebuild(user_ids: Optional[List[str]] = None, batch_size: int = 1000) -> int:
+    """Recomputes user_stats from results, attempts and interview results; all users when user_ids is None.
+
+    Named users are rebuilt one at a time with rebuild_user(), safe under live
+    traffic. The full rebuild replaces documents unconditionally.
+    """
+    if user_ids is not None:
+        rebuilt = 0
+        for user_id in user_ids:
+            rebuilt += await rebuild_user(user_id, batch_size)
+        return rebuilt
+
+    now = datetime.utcnow()
+    docs = await _compute({}, batch_size)
+    for doc in docs.values():
+        doc["updated_at"] = now
+    operations = [ReplaceOne({"_id": uid}, doc, upsert=True) for uid, doc in docs.items()]
+    for i in range(0, len(operations), batch_size):
+        await user_stats_collection.bulk_write(operations[i:i + batch_size], ordered=False)
+    # Users whose results were all deleted since the last build
+    await user_stats_collection.delete_many({"updated_at": {"$lt": now}})
+    counters["rebuilt_users"] += len(operations)
+    return len(operations)
+
+
+async def run(user_ids: Optional[List[str]], batch_size: int):
+    start = time.perf_counter()
+    rebuilt = await rebuild(user_ids, batch_size)
+    print(json.dumps({"rebuilt_users": rebuilt, "seconds": round(time.perf_counter() - start, 2)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the per-user dashboard statistics from stored results.")
+    parser.add_argument("--user", action="append", dest="users", help="only this user id (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    asyncio.run(run(args.users, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
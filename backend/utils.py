@@ -5,10 +5,20 @@ from datetime import datetime, timedelta
 from fastapi import Request, HTTPException
 from bson import ObjectId
 import os
+from backend import metrics
+from backend.cache import TTLCache
 
 SECRET_KEY = os.getenv("JWT_SECRET", "supersecret")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# Authenticated user documents keyed by token subject, so protected routes
+# don't each pay a users_collection round trip.
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+metrics.register("principal_cache", principal_cache.stats)
 
 # --- Validators ---
 def validate_password(password: str) -> bool:
@@ -24,12 +34,21 @@ def validate_phone(phone: str) -> bool:
     return re.fullmatch(r"\+\d{1,3}\d{10}", phone) is not None
 
 # --- Authentication ---
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+# These are CPU-bound (~100-300 ms each); async handlers should go through
+# backend.passwords.password_hasher, which runs them in a worker pool.
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+def password_hash_rounds(hashed_password: str) -> int:
+    # bcrypt hashes look like $2b$12$<salt+hash>; the second field is the cost factor
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return 0
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
@@ -39,6 +58,17 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def get_token_subject(token: str):
+    """Returns the user id a token was issued for, or None if it doesn't verify."""
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except jwt.JWTError:
+        return None
+
+def invalidate_principal(user_id: str):
+    """Call whenever a user document changes or the user logs out."""
+    principal_cache.invalidate(str(user_id))
+
 async def get_current_user(request: Request):
     from backend.database import users_collection # Changed to absolute import
     token = request.cookies.get("token")
@@ -49,11 +79,14 @@ async def get_current_user(request: Request):
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-        user = await users_collection.find_one({"_id": ObjectId(user_id)})
+        user = principal_cache.get(user_id)
         if user is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        user["_id"] = str(user["_id"]) # Serialize ObjectId
-        return user
+            user = await users_collection.find_one({"_id": ObjectId(user_id)})
+            if user is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            user["_id"] = str(user["_id"]) # Serialize ObjectId
+            principal_cache.set(user_id, user)
+        return dict(user) # Handlers may mutate their copy
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
 
@@ -135,57 +135,12 @@ const TestEnvironment = () => {
         
         setIsSubmitting(true);
         try {
-            // Calculate score based on all answers
-            let totalScore = 0;
-            let totalQuestions = test.questions.length;
-            
-            // For each question, evaluate the answer
-            for (const question of test.questions) {
-                const answer = answers[question.id];
-                
-                if (question.question_type === 'mcq') {
-                    // For MCQ questions, check if answer matches correct_answer
-                    if (answer && answer === question.correct_answer) {
-                        totalScore += 1;
-                    }
-                } else if (question.question_type === 'coding') {
-                    // For coding questions, we need to run all test cases
-                    try {
-                        const allTestCases = question.test_cases || [];
-                        const data = await runCodeWithTestCases(allTestCases);
-                        const passedCount = data.results?.filter(res => res.status?.description === 'Accepted').length || 0;
-                        const questionScore = allTestCases.length > 0 ? (passedCount / allTestCases.length) : 0;
-                        totalScore += questionScore;
-                    } catch (error) {
-                        console.error(`Error evaluating coding question ${question.id}:`, error);
-                    }
-                }
-            }
-
-            // Calculate final percentage score
-            const finalScore = (totalScore / totalQuestions) * 100;
-            setScore(finalScore);
-
-            // Submit all answers to backend
-            try {
-                const submitResponse = await api.post(`/tests/${testId}/submit`, {
-                    answers: answers,
-                    score: finalScore
-                });
-
-                if (finalScore >= 80) {
-                    // Award certification
-                    await api.post('/tests/user/certification', {
-                        test_id: testId,
-                        score: finalScore,
-                        test_name: test.title
-                    });
-                }
-            } catch (submitError) {
-                console.error("Error submitting to backend:", submitError);
-                // Continue even if backend submission fails
-            }
-
+            // Grading happens on the server; the test payload no longer carries
+            // correct answers or hidden test cases.
+            const { data } = await api.post(`/tests/${testId}/submit`, {
+                answers: answers
+            });
+            setScore(data.score);
         } catch (error) {
             console.error("Error in test submission:", error);
             const errorMessage = error.response?.data?.detail || 'Failed to submit test. Please try again.';
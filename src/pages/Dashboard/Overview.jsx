@@ -40,24 +40,14 @@ const Overview = () => {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const [testsRes, examsRes, interviewsRes] = await Promise.all([
-          api.get('/tests/user/attempts'),
-          api.get('/user/results'),
-          api.get('/interview/user/results')
-        ]);
-
-        const testsTaken = testsRes.data.length;
-        const examsCompleted = examsRes.data.length;
-        const interviewsCompleted = interviewsRes.data.length;
-        
-        const totalScore = [
-          ...testsRes.data.map(t => t.score),
-          ...examsRes.data.map(e => e.score),
-          ...interviewsRes.data.map(i => i.final_score * 20) // Convert 5-point scale to percentage
-        ].reduce((sum, score) => sum + score, 0);
-        
-        const totalItems = testsTaken + examsCompleted + interviewsCompleted;
-        const avgScore = totalItems > 0 ? (totalScore / totalItems).toFixed(1) : 0;
+        // Maintained server-side as results are graded, so this is one small read
+        const { data } = await api.get('/user/stats');
+
+        const testsTaken = data.by_type.test.count;
+        const examsCompleted = data.by_type.exam.count;
+        const interviewsCompleted = data.by_type.interview.count;
+        // Interview scores arrive already converted from the 5-point scale to a percentage
+        const avgScore = data.overall.count > 0 ? data.overall.mean.toFixed(1) : 0;
 
         setStats({
           tests_taken: testsTaken,